@@ -0,0 +1,105 @@
+"""
+Compare the CPU time per 1,000 pages of evaluating the domains.py rules on decoded text against evaluating them on bytes
+Decoding a page without a declared charset makes requests detect it over the whole body; bytes are never decoded
+Streamed matching, in the chunks the engines read, is also compared; it may stop reading a page early
+Every method must reach the same verdicts
+"""
+
+from collections.abc import Callable
+import cProfile
+import argparse
+import pstats
+import random
+import time
+
+import requests
+
+from manga.sites.matcher import StreamMatcher, matches
+from manga.sites.test import _chunk_size
+from manga.sites.domains import Rule, domains
+
+_words = ("solo", "leveling", "tower", "of", "god", "the", "return", "villain", "sword", "king", "demon", "lord")
+
+
+def _page(rng: random.Random, rule: Rule, found: bool, size: int) -> bytes:
+    parts: list[str] = ["<!DOCTYPE html><html><head><title>Chapter</title></head><body>"]
+    while sum(map(len, parts)) < size:
+        words = rng.choices(_words, k=12)
+        link: str = f'<a href="/{"-".join(words)}">{" ".join(words)}</a>'
+        parts.append(f'<div class="item-{rng.randint(0, 999)}">{link}</div>\n')
+    parts.insert(rng.randint(1, len(parts)), " ".join(rule.has if found else rule.lacks))
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def _response(body: bytes, content_type: str | None) -> requests.Response:
+    ret = requests.Response()
+    ret._content = body  # pylint: disable=protected-access
+    if content_type is not None:
+        ret.headers["Content-Type"] = content_type
+    return ret
+
+
+def _text(rule: Rule, body: bytes, content_type: str | None) -> bool:
+    """
+    Evaluate rule on the decoded page, as the original _test did
+    """
+    text: str = _response(body, content_type).text
+    return all(i in text for i in rule.has) and not any(i in text for i in rule.lacks)
+
+
+def _stream(rule: Rule, body: bytes) -> bool:
+    m = StreamMatcher(rule)
+    for i in range(0, len(body), _chunk_size):
+        if m.feed(body[i : i + _chunk_size]) is not None:
+            break
+    return m.end()
+
+
+def _check_seams(pages: list[tuple[Rule, bytes]], rng: random.Random) -> None:
+    """
+    Feed pages in random, often tiny, chunks so that markers are split across chunks
+    """
+    for rule, body in pages:
+        cuts = sorted(rng.sample(range(1, len(body)), 64) + [0, len(body)])
+        chunks = [body[i:k] for i, k in zip(cuts, cuts[1:])]
+        m = StreamMatcher(rule)
+        for i in chunks:
+            if m.feed(i) is not None:
+                break
+        assert m.end() == matches(rule, body), "Verdicts differ across chunk boundaries"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1000, help="The number of pages")
+    parser.add_argument("--size", type=int, default=64 << 10, help="The size of each page in bytes")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed")
+    parser.add_argument("--profile", action="store_true", help="Print where decoding pages spends its time")
+    ns = parser.parse_args()
+    rng = random.Random(ns.seed)
+    rules = [i for i in domains.values() if not i.by_status]
+    pages = [(r, _page(rng, r, rng.random() < 0.5, ns.size)) for r in rng.choices(rules, k=ns.n)]
+    _check_seams(pages[:200], rng)
+    methods: dict[str, Callable[[Rule, bytes], bool]] = {
+        "text, charset detected": lambda r, b: _text(r, b, None),
+        "text, charset declared": lambda r, b: _text(r, b, "text/html; charset=utf-8"),
+        "bytes": matches,
+        "bytes, streamed": _stream,
+    }
+    verdicts: dict[str, list[bool]] = {}
+    print(f"{ns.n} pages of {ns.size >> 10}KB, CPU seconds per 1,000 pages:")
+    for name, fn in methods.items():
+        start = time.process_time()
+        verdicts[name] = [fn(r, b) for r, b in pages]
+        print(f"\t{name:<24} {(time.process_time() - start) * 1000 / ns.n:.4f}s")
+    assert len({tuple(i) for i in verdicts.values()}) == 1, "Methods reached different verdicts"
+    if ns.profile:
+        with cProfile.Profile() as profile:
+            for r, b in pages[:100]:
+                _text(r, b, None)
+        pstats.Stats(profile).sort_stats("cumulative").print_stats(12)
+
+
+if __name__ == "__main__":
+    main()
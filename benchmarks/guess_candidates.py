@@ -0,0 +1,82 @@
+"""
+Benchmark finding the files guess may update via Candidates against a linear are_same scan
+Synthetic libraries are generated; both methods must find the same options
+"""
+
+from collections.abc import Callable
+import argparse
+import random
+import string
+import time
+
+from manga.tools.guess import Candidates, are_same, scrub
+
+_words = ("the", "hero", "tower", "god", "return", "of", "villain", "solo", "level", "up", "sword", "demon", "king")
+_formats = ("https://{}/manga/{}/chapter-{{}}/", "https://www.{}/{}-chapter-{{}}", "https://{}/series/{}/{{}}")
+_sites = ("mangaclash.com", "asuracomic.net", "flamecomics.xyz", "manhuaus.com", "mangabuddy.com")
+
+
+def _name(i: int) -> str:
+    """
+    A unique name without digits, so that are_same never needs to prompt
+    """
+    return string.ascii_lowercase[i % 26] + (_name(i // 26) if i >= 26 else "")
+
+
+def _series(rng: random.Random, i: int) -> str:
+    """
+    Return a URL format string of series i, with {} in place of the chapter
+    """
+    title = "-".join(rng.choices(_words, k=rng.randint(2, 5))) + "-" + _name(i)
+    return rng.choice(_formats).format(rng.choice(_sites), title)
+
+
+def _chapter(rng: random.Random) -> float:
+    return rng.randint(1, 400) + rng.choice((0, 0, 0, 0.5))
+
+
+def _fmt(n: float) -> str:
+    return str(int(n) if n == int(n) else n)
+
+
+def _options(find: Callable[[str], list[str]], x: str) -> list[str] | str:
+    try:
+        return [i for i in find(x) if are_same(x, i)]
+    except AssertionError as e:
+        return str(e)
+
+
+def bench(size: int, raws: int, seed: int) -> None:
+    rng = random.Random(seed)
+    series: list[str] = [_series(rng, i) for i in range(size + raws)]
+    chapters: list[float] = [_chapter(rng) for _ in series]
+    keys: list[str] = [scrub(i.format(_fmt(k))) for i, k in zip(series[:size], chapters)]
+    urls: list[str] = [scrub(i.format(_fmt(_chapter(rng)))) for i in series[size : size + raws // 4]]  # Unknown
+    for i in rng.sample(range(size), raws - len(urls)):
+        urls.append(scrub(series[i].format(_fmt(int(chapters[i]) + rng.randint(1, 3)))))
+    start = time.perf_counter()
+    candidates = Candidates(keys)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [_options(candidates, i) for i in urls]
+    lookup = time.perf_counter() - start
+    start = time.perf_counter()
+    linear = [_options(lambda _: keys, i) for i in urls]
+    scan = time.perf_counter() - start
+    assert indexed == linear, "Candidates found different options than a linear scan"
+    print(f"{len(keys)} files, {len(urls)} raws, {sum(isinstance(i, list) and len(i) > 0 for i in linear)} found:")
+    print(f"\tLinear scan: {scan:.3f}s\n\tIndex build: {built:.3f}s\n\tIndex lookups: {lookup:.3f}s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000], help="Library sizes")
+    parser.add_argument("--raws", type=int, default=200, help="The number of files to guess")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed")
+    ns = parser.parse_args()
+    for i in ns.sizes:
+        bench(i, ns.raws, ns.seed)
+
+
+if __name__ == "__main__":
+    main()
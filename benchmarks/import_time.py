@@ -0,0 +1,99 @@
+"""
+Measure the cold start import time of the module of every script in pyproject.toml with python -X importtime
+Results may be saved as JSON and compared against a saved baseline or a budget; slower scripts fail the run
+Example:
+    python benchmarks/import_time.py -o baseline.json
+    python benchmarks/import_time.py -b baseline.json --budget 100
+"""
+
+from pathlib import Path
+import subprocess
+import argparse
+import tomllib
+import json
+import sys
+
+_root = Path(__file__).resolve().parent.parent
+# Third party packages a script should only import if it needs them
+_heavy = ("aiohttp", "argcomplete", "osascript", "requests", "rich", "tldextract", "tqdm", "watchdog", "zstdlib")
+
+
+def _scripts() -> dict[str, str]:
+    """
+    Map each script in pyproject.toml to the module of its entry point
+    """
+    with (_root / "pyproject.toml").open("rb") as f:
+        scripts: dict[str, str] = tomllib.load(f)["project"]["scripts"]
+    return {i: k.split(":", 1)[0] for i, k in scripts.items()}
+
+
+def _import(module: str) -> tuple[float, set[str]]:
+    """
+    Import module in a new interpreter; return the seconds it took and the top level packages it imported
+    """
+    cmd = (sys.executable, "-X", "importtime", "-c", f"import {module}")
+    out = subprocess.run(cmd, cwd=_root, capture_output=True, text=True, check=True).stderr
+    seconds: float = 0.0
+    packages: set[str] = set()
+    for line in out.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        packages.add(name.strip().split(".", 1)[0])
+        if name.strip() == module:
+            seconds = int(cumulative) / 1e6
+    return seconds, packages
+
+
+def measure(module: str, repeat: int) -> dict[str, float | list[str]]:
+    """
+    The best of repeat cold imports of module, and the heavy packages it imported
+    """
+    runs = [_import(module) for _ in range(repeat)]
+    return {"seconds": min(i for i, _ in runs), "heavy": sorted(set(_heavy) & runs[0][1])}
+
+
+def _compare(results: dict[str, dict], baseline: dict[str, dict], tolerance: float, budget: float | None) -> bool:
+    """
+    Print how results compare to baseline and budget; return false if any script is over either
+    """
+    ok: bool = True
+    print(f"\n{'Script':<20} {'Baseline':>9} {'Current':>9} {'Ratio':>6}")
+    for name, got in results.items():
+        flag: str = ""
+        if budget is not None and got["seconds"] * 1000 > budget:
+            flag, ok = "  OVER BUDGET", False
+        if (old := baseline.get(name)) is None:
+            print(f"{name:<20} {'-':>9} {got['seconds'] * 1000:>7.1f}ms {'new':>6}{flag}")
+            continue
+        ratio: float = got["seconds"] / old["seconds"]
+        if ratio > 1 + tolerance:
+            flag, ok = flag + "  REGRESSION", False
+        print(f"{name:<20} {old['seconds'] * 1000:>7.1f}ms {got['seconds'] * 1000:>7.1f}ms {ratio:>6.2f}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", "--filter", default="", help="Only measure scripts whose names contain this")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="The number of cold imports of each module")
+    parser.add_argument("-o", "--output", type=Path, help="Save the results to this JSON file")
+    parser.add_argument("-b", "--baseline", type=Path, help="Compare the results against this saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="The slowdown allowed before a regression")
+    parser.add_argument("--budget", type=float, help="The most milliseconds any script may take to import")
+    ns = parser.parse_args()
+    results: dict[str, dict] = {}
+    for name, module in _scripts().items():
+        if ns.filter in name:
+            results[name] = measure(module, ns.repeat)
+            heavy: str = ", ".join(results[name]["heavy"]) or "-"
+            print(f"{name:<20} {results[name]['seconds'] * 1000:>7.1f}ms  imports {heavy}")
+    if ns.output is not None:
+        ns.output.write_text(json.dumps({"python": sys.version, "results": results}, indent=1))
+    if ns.baseline is not None or ns.budget is not None:
+        baseline = {} if ns.baseline is None else json.loads(ns.baseline.read_text())["results"]
+        sys.exit(0 if _compare(results, baseline, ns.tolerance, ns.budget) else 1)
+
+
+if __name__ == "__main__":
+    main()
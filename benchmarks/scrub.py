@@ -0,0 +1,93 @@
+"""
+Check that scrub matches the original scrubber on a corpus of URLs and compare their speed
+The corpus is the URLs of a library, if given, otherwise synthetic URLs
+"""
+
+from collections.abc import Callable
+from pathlib import Path
+import argparse
+import random
+import time
+import re
+
+from manga.utils import library, scrub, scrub_many
+
+
+def _remove_unwanted_periods(x: str) -> str:
+    """
+    The original implementation of remove_unwanted_periods
+    """
+    for offset, pat in enumerate((r"\.[^\d]", r"[^\d]\.")):
+        res: re.Match | None = re.compile(pat).search(x)
+        if res is not None:
+            idx: int = offset + x.find(res.group())
+            x = x[:idx] + x[idx + 1 :]
+            return _remove_unwanted_periods(x)
+    while len(x) and x[0] == ".":
+        x = x[1:]
+    while len(x) and x[-1] == ".":
+        x = x[:-1]
+    return x
+
+
+def _scrub(x: str, *, remove_numbers: bool = False) -> str:
+    """
+    The original implementation of scrub
+    """
+    x = x.split("?", 1)[0].split("#", 1)[0]
+    x = x.lower()
+    x = re.sub(r"http://ww\d*\.", "", x)
+    x = re.sub(r"https://ww\d*\.", "", x)
+    x = re.sub(r"http://www\d*\.", "", x)
+    x = re.sub(r"https://www\d*\.", "", x)
+    x = x.replace("https", "").replace("http", "").replace("www", "")
+    if remove_numbers:
+        x = re.sub(r"\d", "", x)
+    x = re.sub(r"[^a-z\. \d]", " ", x)
+    x = _remove_unwanted_periods(x)
+    while "  " in x:
+        x = x.replace("  ", " ")
+    return x.strip()
+
+
+def _synthetic(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    words = ("Solo", "leveling", "tower", "of", "god", "the", "return", "villain's", "sword", "king", "v2", "3.5")
+    prefixes = ("https://", "http://", "https://www.", "https://ww3.", "https://m.")
+    domains = ("mangaclash.com", "asuracomic.net", "flame-comics.xyz", "manhua.us", "mangabuddy.com")
+    ret: list[str] = []
+    for _ in range(n):
+        title = rng.choice("-_ ").join(rng.choices(words, k=rng.randint(2, 8)))
+        ch = f"{rng.randint(1, 500)}" + rng.choice(("", "", ".5", "-5", "..1"))
+        query = rng.choice(("", "", "?page=2", "#top", "?a=b.c#d"))
+        ret.append(f"{rng.choice(prefixes)}{rng.choice(domains)}/manga/{title}/chapter-{ch}/{query}")
+    return ret
+
+
+def _time(name: str, urls: list[str], fn: Callable[[list[str]], list[str]]) -> list[str]:
+    start = time.perf_counter()
+    ret = fn(urls)
+    print(f"\t{name}: {time.perf_counter() - start:.3f}s")
+    return ret
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory", type=Path, nargs="?", help="A library whose URLs form the corpus")
+    parser.add_argument("-n", type=int, default=100_000, help="The number of synthetic URLs")
+    parser.add_argument("--seed", type=int, default=0, help="The random seed")
+    ns = parser.parse_args()
+    urls = [i.url for i in library(ns.directory).values()] if ns.directory else _synthetic(ns.n, ns.seed)
+    for remove_numbers in (False, True):
+        print(f"{len(urls)} URLs, remove_numbers={remove_numbers}:")
+        old = _time("Original", urls, lambda x: [_scrub(i, remove_numbers=remove_numbers) for i in x])
+        scrub.cache_clear()
+        new = _time("Compiled", urls, lambda x: scrub_many(x, remove_numbers=remove_numbers))
+        _time("Cached", urls, lambda x: scrub_many(x, remove_numbers=remove_numbers))
+        bad = [(i, k, j) for i, k, j in zip(urls, old, new) if k != j]
+        assert not bad, "Mismatches:\n" + "\n".join(f"\t{i}: {k!r} != {j!r}" for i, k, j in bad[:10])
+    print("All URLs scrubbed identically")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Benchmarks of the hot paths of the tools
+Results may be saved as JSON and compared against a saved baseline; slower results are reported as regressions
+Example:
+    python benchmarks/suite.py -o baseline.json
+    python benchmarks/suite.py -b baseline.json
+"""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+from pathlib import Path
+import tempfile
+import platform
+import argparse
+import timeit
+import random
+import json
+import time
+import sys
+import io
+
+from urllib3 import HTTPResponse
+import requests
+
+from manga.utils import extract_url_from_contents, split_on_num, lsf, scrub
+from manga.tools.guess import are_same
+from manga.sites.domains import domains
+from manga.sites.matcher import matches
+from manga import sites
+
+Setup = Callable[[argparse.Namespace], tuple[Callable[[], Any], int]]
+
+
+@dataclass(frozen=True)
+class Case:
+    """
+    A benchmark: setup returns the function to time, which processes items items per call
+    """
+
+    name: str
+    setup: Setup
+    repeat: int = 5
+
+
+_cases: list[Case] = []
+
+
+def _case(name: str, repeat: int = 5) -> Callable[[Setup], Setup]:
+    def decorator(setup: Setup) -> Setup:
+        _cases.append(Case(name, setup, repeat))
+        return setup
+
+    return decorator
+
+
+#
+# Synthetic data
+#
+
+
+_words = ("solo", "leveling", "tower", "of", "god", "the", "return", "villain", "sword", "king", "demon", "lord")
+_sites = tuple(i for i, k in domains.items() if not k.by_status)
+_formats = {
+    ".url": "[InternetShortcut]\nURL={}\n",
+    ".desktop": "[Desktop Entry]\nEncoding=UTF-8\nName=Link\nType=Link\nURL={}\nIcon=text-html\n",
+    ".webloc": '<?xml version="1.0" encoding="UTF-8"?>\n<plist version="1.0">\n<dict>\n'
+    "\t<key>URL</key>\n\t<string>{}</string>\n</dict>\n</plist>\n",
+}
+
+
+def _urls(n: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    ret: list[str] = []
+    for i in range(n):
+        title = "-".join(rng.choices(_words, k=rng.randint(2, 6))) + f"-{i}"
+        chapter = str(rng.randint(1, 400)) + rng.choice(("", "", "", ".5"))
+        ret.append(f"https://www.{rng.choice(_sites)}/manga/{title}/chapter-{chapter}/?page=1")
+    return ret
+
+
+def _library(root: Path, n: int) -> Path:
+    """
+    Create (or reuse) a library of n bookmarks spread over nested directories in root
+    """
+    d = root / f"library-{n}"
+    if not (d / ".complete").exists():
+        for i, url in enumerate(_urls(n)):
+            sub = d / f"{i % 7}" / f"{i % 13}"
+            sub.mkdir(parents=True, exist_ok=True)
+            ext = tuple(_formats)[i % 3]
+            (sub / f"{url.split('/')[-3]} {split_on_num(url)[1]}{ext}").write_text(_formats[ext].format(url))
+        (d / ".complete").write_text("")
+    return d
+
+
+def _html(size: int, body: str, seed: int = 0) -> bytes:
+    """
+    A page of about size bytes of realistic looking markup, with body near its end
+    """
+    rng = random.Random(seed)
+    parts: list[str] = ["<!DOCTYPE html><html><head><title>Chapter</title></head><body>"]
+    length: int = 0
+    while length < size:
+        words = " ".join(rng.choices(_words, k=12))
+        part = f'<div class="item-{rng.randint(0, 999)}"><a href="/manga/{words.replace(" ", "-")}">{words}</a></div>\n'
+        parts.append(part)
+        length += len(part)
+    parts.insert(len(parts) * 9 // 10, body)
+    parts.append("</body></html>")
+    return "".join(parts).encode()
+
+
+def _page(domain: str, found: bool, size: int) -> bytes:
+    rule = domains[domain]
+    return _html(size, " ".join(rule.has) if found else " ".join(rule.lacks))
+
+
+#
+# Micro benchmarks
+#
+
+
+@_case("scrub")
+def _scrub(_: argparse.Namespace):
+    urls = _urls(1000)
+    fn = scrub.__wrapped__  # Uncached
+    return lambda: [fn(i) for i in urls], len(urls)
+
+
+@_case("scrub.cached")
+def _scrub_cached(_: argparse.Namespace):
+    urls = _urls(1000)
+    return lambda: [scrub(i) for i in urls], len(urls)
+
+
+@_case("are_same")
+def _are_same(_: argparse.Namespace):
+    urls = [scrub(i) for i in _urls(1000)]
+    pairs = [(i, i.replace(str(int(split_on_num(i)[1])), str(int(split_on_num(i)[1]) + 1))) for i in urls]
+    pairs += [(i, k) for i, k in zip(urls, urls[1:])]
+    return lambda: [are_same(i, k) for i, k in pairs if i != k], len(pairs)
+
+
+@_case("split_on_num")
+def _split_on_num(_: argparse.Namespace):
+    urls = _urls(1000)
+    fn = split_on_num.__wrapped__  # Uncached
+    return lambda: [fn(i) for i in urls], len(urls)
+
+
+def _extract(ext: str) -> Setup:
+    def setup(_: argparse.Namespace):
+        data = [_formats[ext].format(i).strip() for i in _urls(1000)]
+        return lambda: [extract_url_from_contents(i, ext) for i in data], len(data)
+
+    return setup
+
+
+for _ext in _formats:
+    _case(f"extract_url{_ext}")(_extract(_ext))
+
+
+def _matches(domain: str, size: int, found: bool) -> Setup:
+    def setup(_: argparse.Namespace):
+        page = _page(domain, found, size)
+        return lambda: matches(domains[domain], page), 1
+
+    return setup
+
+
+for _domain, _rule in domains.items():
+    if not _rule.by_status:
+        for _kb in (50, 500):
+            for _found in (True, False):
+                _case(f"matches.{_domain}.{_kb}KB.{'hit' if _found else 'miss'}")(_matches(_domain, _kb << 10, _found))
+
+
+#
+# Macro benchmarks
+#
+
+
+def _lsf(n: int) -> Setup:
+    def setup(ns: argparse.Namespace):
+        d = _library(ns.workdir, n)
+        return lambda: lsf(d), n
+
+    return setup
+
+
+for _n in (1_000, 10_000, 100_000):
+    _case(f"lsf.{_n}", repeat=3)(_lsf(_n))
+
+
+class _StubAdapter(requests.adapters.BaseAdapter):
+    """
+    A transport serving generated pages; chapters up to last exist
+    """
+
+    def __init__(self, domain: str, last: int) -> None:
+        super().__init__()
+        self._pages = {i: _page(domain, i, 64 << 10) for i in (True, False)}
+        self._last: int = last
+
+    def send(self, request: requests.PreparedRequest, *_: Any, **__: Any) -> requests.Response:
+        ret = requests.Response()
+        ret.url = request.url or ""
+        ret.request = request
+        ret.status_code = 200
+        chapter = float(ret.url.rstrip("/").rsplit("chapter-", 1)[1].replace("-", "."))
+        ret.raw = HTTPResponse(io.BytesIO(self._pages[chapter <= self._last]), preload_content=False)
+        return ret
+
+    def close(self) -> None:
+        pass
+
+
+@_case("test_url", repeat=3)
+def _test_url(ns: argparse.Namespace):
+    # pylint: disable=import-outside-toplevel
+    from manga.tools.test_sites import test_url as module
+    from manga.tools.test_sites.probe_plans import plans
+    from manga.tools.test_sites.probe_store import probes
+
+    sites.cache.enabled = probes.enabled = False
+    plans.path = ns.workdir / "probe_plans.json"
+    sites.limiter.configure(1e9, 1 << 30)
+    urls: list[str] = []
+    for i, domain in enumerate(_sites):
+        sites.pool.session(domain).mount("https://", _StubAdapter(domain, 100))
+        urls += [f"https://{domain}/manga/series-{i}/chapter-{n}/" for n in (98, 100, 101, 103)]
+
+    def run() -> None:
+        module._found.clear()  # pylint: disable=protected-access
+        for i in urls:
+            module.test_url(i)
+
+    return run, len(urls)
+
+
+#
+# Runner
+#
+
+
+def _measure(case: Case, ns: argparse.Namespace) -> dict[str, float]:
+    fn, items = case.setup(ns)
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    best: float = min(timer.repeat(repeat=case.repeat, number=number)) / number
+    return {"seconds": best, "items": items, "per_item": best / items}
+
+
+def _compare(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]], tolerance: float) -> bool:
+    """
+    Print how results compare to baseline; return false if any benchmark regressed by more than tolerance
+    """
+    ok: bool = True
+    print(f"\n{'Benchmark':<48} {'Baseline':>12} {'Current':>12} {'Ratio':>7}")
+    for name, got in results.items():
+        if (old := baseline.get(name)) is None:
+            print(f"{name:<48} {'-':>12} {got['per_item']:>12.3e} {'new':>7}")
+            continue
+        ratio: float = got["per_item"] / old["per_item"]
+        flag: str = ""
+        if ratio > 1 + tolerance:
+            flag, ok = "  REGRESSION", False
+        print(f"{name:<48} {old['per_item']:>12.3e} {got['per_item']:>12.3e} {ratio:>7.2f}{flag}")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-k", "--filter", default="", help="Only run benchmarks whose names contain this")
+    parser.add_argument("-o", "--output", type=Path, help="Save the results to this JSON file")
+    parser.add_argument("-b", "--baseline", type=Path, help="Compare the results against this saved JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="The slowdown allowed before a regression")
+    parser.add_argument(
+        "--workdir", type=Path, default=Path(tempfile.gettempdir()) / "manga-bench", help="Where to generate data"
+    )
+    ns = parser.parse_args()
+    ns.workdir.mkdir(parents=True, exist_ok=True)
+    results: dict[str, dict[str, float]] = {}
+    for case in _cases:
+        if ns.filter in case.name:
+            results[case.name] = _measure(case, ns)
+            print(f"{case.name:<48} {results[case.name]['per_item']:.3e}s per item")
+    if ns.output is not None:
+        meta = {"python": platform.python_version(), "machine": platform.machine(), "time": time.time()}
+        ns.output.write_text(json.dumps({"meta": meta, "results": results}, indent=1))
+    if ns.baseline is not None:
+        baseline = json.loads(ns.baseline.read_text())["results"]
+        sys.exit(0 if _compare(results, baseline, ns.tolerance) else 1)
+
+
+if __name__ == "__main__":
+    main()
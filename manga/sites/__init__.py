@@ -1,6 +1,31 @@
+from typing import TYPE_CHECKING
+
 from .unknown_domain import UnknownDomain
-from .test import test, get_domain
+from .get_domain import get_domain
+from .test import test
+from .pool import PoolStats, SessionPool, pool
+from .cache import RevalidationCache, cache
+from .rate_limit import RateLimiter, limiter
+from .override import HostOverride, override
+from .metrics import Metrics, metrics
+from .head import HeadSupport, heads
+from .warm_up import Resolver, resolver, warm_up
 
 from .domains import domains as _domains
 
+if TYPE_CHECKING:
+    from .async_test import Engine
+
 domains = set(_domains.keys())
+
+
+def __getattr__(name: str) -> type[Engine]:
+    """
+    Engine is imported on first use, as only the async engine needs aiohttp
+    """
+    if name != "Engine":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .async_test import Engine  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    globals()["Engine"] = Engine
+    return Engine
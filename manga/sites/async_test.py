@@ -0,0 +1,225 @@
+from typing import TYPE_CHECKING
+from random import choice
+import threading
+import asyncio
+import time
+
+import requests
+import aiohttp
+
+from .unknown_domain import UnknownDomain
+from .test import Retry, _agents, _chunk_size
+from .get_domain import get_domain
+from .domains import Rule, domains
+from .matcher import StreamMatcher
+from .rate_limit import limiter, retry_after
+from .override import override
+from .metrics import Transfer, metrics
+from .head import heads
+from .encoding import accept_encoding
+from .cache import cache
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from collections.abc import Coroutine
+    from typing import Any
+
+
+class Engine:
+    """
+    An asyncio version of test
+    Every request shares one event loop running on a single background thread
+    Concurrency is bounded both per domain and in total
+    Errors are raised as requests exceptions so callers may treat both engines the same
+    """
+
+    def __init__(self, per_domain: int = 8, total: int = 256) -> None:
+        assert per_domain > 0 and total > 0, "Concurrency limits must be positive"
+        self.per_domain: int = per_domain
+        self.total: int = total
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="manga-engine", daemon=True)
+        self._session: aiohttp.ClientSession | None = None
+        self._limits: dict[str, asyncio.Semaphore] = {}
+
+    def _limit(self, domain: str) -> asyncio.Semaphore:
+        if (ret := self._limits.get(domain)) is None:
+            ret = self._limits[domain] = asyncio.Semaphore(self.per_domain)
+        return ret
+
+    @staticmethod
+    async def _evaluate(r: aiohttp.ClientResponse, rule: Rule) -> bool:
+        """
+        Stream the body of r into rule until the verdict is decided
+        The body is decompressed as it is read, so only what the verdict needed is downloaded
+        """
+        if rule.by_status:
+            return True
+        matcher = StreamMatcher(rule)
+        async for chunk in r.content.iter_chunked(_chunk_size):
+            if matcher.feed(chunk) is not None:
+                break
+        return matcher.end()
+
+    async def _request(
+        self, url: str, domain: str, rule: Rule, timeout: float, method: str = "GET"
+    ) -> tuple[bool | Retry, int | None]:
+        """
+        Request url once, once the rate limiter allows
+        Return the verdict, or why the request should be retried, and the status of the response if one was received
+        method may be HEAD only if rule is status-only; a HEAD neither uses nor updates the cache
+        The cache is on disk, so it is used from another thread so as not to block the event loop
+        The request is recorded in metrics whether or not it succeeds
+        """
+        assert self._session is not None, "Engine is not running"
+        entry = await asyncio.to_thread(cache.lookup, url, rule) if method == "GET" and cache.enabled else None
+        target, host = override.rewrite(url)
+        headers: dict[str, str] = {"User-Agent": choice(_agents), **host, **(entry.headers() if entry else {})}
+        # As with requests, timeout bounds connecting and each read rather than the whole request
+        client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=timeout, sock_read=timeout)
+        async with self._limit(domain):
+            queued: float = time.monotonic()
+            await limiter.acquire_async(domain)
+            start: float = time.monotonic()
+            r: aiohttp.ClientResponse | None = None
+            try:
+                async with self._session.request(method, target, headers=headers, timeout=client_timeout) as r:
+                    if r.status in (429, 503):
+                        return Retry(f"Got {r.status}", retry_after(r.headers.get("Retry-After")), True), r.status
+                    limiter.bucket(domain).success()
+                    if r.status == 304 and entry is not None:
+                        return entry.verdict, r.status
+                    if r.status < 400:
+                        ret: bool = await self._evaluate(r, rule)
+                        if method == "GET" and cache.enabled:
+                            await asyncio.to_thread(cache.store, url, rule, r.headers, ret)
+                        return ret, r.status
+                    if r.status != 404:
+                        print(f"Got {r.status} from {method} {url}")
+                    return False, r.status
+            except aiohttp.ConnectionTimeoutError as e:  # Not retried, as requests.exceptions.ConnectTimeout is not
+                raise requests.exceptions.ConnectTimeout(f"{type(e).__name__}: {e}") from e
+            except TimeoutError:
+                return Retry("ReadTimeout"), None
+            except aiohttp.ClientError as e:
+                raise requests.exceptions.ConnectionError(f"{type(e).__name__}: {e}") from e
+            finally:
+                status: int | None = None
+                body: Transfer | None = None
+                if r is not None:
+                    status = r.status
+                    encoding: str = r.headers.get("Content-Encoding", "identity")
+                    # A response without a body, such as to a HEAD, has an empty reader which does not count bytes
+                    if isinstance(r.content, aiohttp.streams.EmptyStreamReader):
+                        body = Transfer(0, 0, encoding)
+                    else:
+                        body = Transfer(r.content.total_raw_bytes, r.content.total_bytes, encoding)
+                metrics.record(domain, status, time.monotonic() - start, body, start - queued)
+
+    async def _get(self, url: str, domain: str, rule: Rule, timeout: float, method: str = "GET") -> bool | Retry:
+        """
+        The verdict of _request
+        """
+        return (await self._request(url, domain, rule, timeout, method))[0]
+
+    async def _status_only(self, url: str, domain: str, rule: Rule, timeout: float) -> bool | Retry:
+        """
+        Request url, a page of a status-only domain, with HEAD if the domain's HEAD responses are trusted, else GET
+        While that is not yet known, the page may also be requested with HEAD to compare their statuses, see HeadSupport
+        """
+        if (trusted := heads.trusted(domain)) is not None:
+            return await self._get(url, domain, rule, timeout, "HEAD" if trusted else "GET")
+        got, status = await self._request(url, domain, rule, timeout)
+        if isinstance(got, Retry) or status is None:
+            return got
+        try:
+            if (head := (await self._request(url, domain, rule, timeout, "HEAD"))[1]) is not None:
+                heads.compare(domain, status, head)
+        except requests.exceptions.RequestException:
+            pass  # The check is retried on a later page
+        return got
+
+    async def test(self, url: str, timeout: float = 7.5, timeout_retries: int = 0, base_delay: float = 7.5) -> bool:
+        """
+        Return true if the given chapter is found
+        If a timeout occurs or the site throttles us, retries at most timeout_retries times; sleeps in between
+        If the site throttles us, the whole domain is paused for its Retry-After, or else for the backoff delay
+        The per domain limit is not held while sleeping
+        """
+        domain: str = get_domain(url)
+        try:
+            rule: Rule = domains[domain]
+        except KeyError:
+            raise UnknownDomain(url)  # pylint: disable=raise-missing-from
+        get = self._status_only if rule.by_status else self._get
+        while isinstance(got := await get(url, domain, rule, timeout), Retry):
+            delay: float = base_delay if got.pause is None else got.pause
+            if got.throttled:
+                limiter.bucket(domain).throttle(delay)
+            if timeout_retries <= 0:
+                raise RuntimeError(got.what)
+            if delay > 60:
+                print(f"{got.what} for: {url}: Sleeping for {delay} seconds then trying again")
+            metrics.retry(domain, 0.0 if got.throttled else delay)
+            if not got.throttled:
+                await asyncio.sleep(delay)
+            timeout_retries -= 1
+            base_delay = min(base_delay * 2, 960.0)
+        return got
+
+    async def warm(self, url: str, timeout: float = 7.5) -> bool:
+        """
+        Open a pooled connection to the host of url with a HEAD of its root; return false on failure
+        The HEAD is rate limited and recorded in metrics like any other request
+        """
+        assert self._session is not None, "Engine is not running"
+        domain: str = get_domain(url)
+        target, host = override.rewrite(url)
+        headers: dict[str, str] = {"User-Agent": choice(_agents), **host}
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        queued: float = time.monotonic()
+        await limiter.acquire_async(domain)
+        start: float = time.monotonic()
+        status: int | None = None
+        body: Transfer | None = None
+        try:
+            async with self._session.head(target, headers=headers, timeout=client_timeout, allow_redirects=False) as r:
+                status = r.status
+                body = Transfer(0, 0, r.headers.get("Content-Encoding", "identity"))
+                return True
+        except TimeoutError, aiohttp.ClientError:
+            return False
+        finally:
+            metrics.record(domain, status, time.monotonic() - start, body, start - queued)
+
+    def run[T](self, coro: Coroutine[Any, Any, T]) -> Future[T]:
+        """
+        Schedule coro on the engine's event loop from any thread
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def submit(self, url: str, **kwargs: Any) -> Future[bool]:
+        """
+        Thread-safe: schedule test(url, **kwargs) and return its future
+        """
+        return self.run(self.test(url, **kwargs))
+
+    async def _open(self) -> None:
+        connector = aiohttp.TCPConnector(limit=self.total, ttl_dns_cache=None)  # DNS answers last the run
+        self._session = aiohttp.ClientSession(connector=connector, headers={"Accept-Encoding": accept_encoding})
+
+    async def _close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def __enter__(self) -> Engine:
+        self._thread.start()
+        self.run(self._open()).result()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.run(self._close()).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
@@ -0,0 +1,109 @@
+from typing import TYPE_CHECKING, NamedTuple
+from pathlib import Path
+import threading
+import sqlite3
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Mapping
+
+    from .domains import Rule
+
+
+class Entry(NamedTuple):
+    etag: str | None
+    last_modified: str | None
+    verdict: bool
+
+    def headers(self) -> dict[str, str]:
+        """
+        The conditional GET headers to revalidate this entry with
+        """
+        ret: dict[str, str] = {}
+        if self.etag is not None:
+            ret["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            ret["If-Modified-Since"] = self.last_modified
+        return ret
+
+
+class RevalidationCache:
+    """
+    A thread-safe on-disk cache mapping URLs to their HTTP validators and the verdict their page yielded
+    A 304 response to a conditional GET may then reuse the cached verdict
+    Verdicts are only reused if the domain's Rule has not changed since they were stored
+    Once there are more than max_entries, the least recently used entries are evicted
+    The database is not opened until first used
+    """
+
+    _evict_every: int = 256
+
+    def __init__(self, path: Path = Path.home() / ".cache/manga_scrape/http.sqlite3", max_entries: int = 100_000):
+        self.path: Path = path
+        self.max_entries: int = max_entries
+        self.enabled: bool = True
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._stores: int = 0
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(url TEXT PRIMARY KEY, rule TEXT, etag TEXT, last_modified TEXT, verdict INTEGER, used REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_used ON cache (used)")
+        return self._db
+
+    def lookup(self, url: str, rule: Rule) -> Entry | None:
+        """
+        Return the entry for url if it exists and was evaluated with rule
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            db = self._conn()
+            row = db.execute("SELECT rule, etag, last_modified, verdict FROM cache WHERE url = ?", (url,)).fetchone()
+            if row is None or row[0] != repr(rule):
+                return None
+            db.execute("UPDATE cache SET used = ? WHERE url = ?", (time.time(), url))
+        return Entry(row[1], row[2], bool(row[3]))
+
+    def store(self, url: str, rule: Rule, headers: Mapping[str, str], verdict: bool) -> None:
+        """
+        Store the verdict for url, if the response headers contain validators
+        """
+        etag: str | None = headers.get("ETag")
+        last_modified: str | None = headers.get("Last-Modified")
+        if not self.enabled or (etag is None and last_modified is None):
+            return
+        with self._lock:
+            db = self._conn()
+            db.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?)",
+                (url, repr(rule), etag, last_modified, int(verdict), time.time()),
+            )
+            self._stores += 1
+            if self._stores % self._evict_every == 0:
+                self._evict(db)
+
+    def _evict(self, db: sqlite3.Connection) -> None:
+        (count,) = db.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if count > self.max_entries:
+            db.execute(
+                "DELETE FROM cache WHERE url IN (SELECT url FROM cache ORDER BY used LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._evict(self._db)
+                self._db.close()
+                self._db = None
+
+
+cache = RevalidationCache()
@@ -1,72 +1,29 @@
 """
-The functions in this file return true if a chapter is found for the specific site
-They take in as input the html of the webpage
+The rules in this file determine if a chapter is found for the specific site
+They are evaluated against the html of the webpage by manga.sites.matcher
+Supporting a new domain only requires adding a Rule to domains
 """
 
-from collections.abc import Callable
+from dataclasses import dataclass
 
 #
-# Return true if chapter is found
+# Rules
 #
 
 
-def mangakakalot_gg(data: str) -> bool:
-    return "next" in data and "PREV CHAPTER" in data and "moveToListChapter" not in data
+@dataclass(frozen=True, slots=True)
+class Rule:
+    """
+    How to tell if a chapter is found for a site
+    A chapter is found if the page contains every marker in has and no marker in lacks
+    If by_status the body is ignored: a chapter is found unless the site returns 404
+    At most max_bytes of the page are read when streaming it
+    """
 
-
-def mangabuddy_com(data: str) -> bool:
-    return '"Next chapter"' in data and '"Previous chapter"' in data
-
-
-def toonclash_com(data: str) -> bool:
-    return "cursorNext" in data and "Alternative" not in data
-
-
-def mangaclash_com(data: str) -> bool:
-    return "cursorNext" in data and "Alternative" not in data
-
-
-def manhuaus_com(data: str) -> bool:
-    return "btn prev_page" in data and "Show more" not in data
-
-
-def manhuaus_org(data: str) -> bool:
-    return "prev_page" in data and "main-menu" not in data
-
-
-def manhwatop_com(data: str) -> bool:
-    return "Next" in data and "Show more" not in data
-
-
-def manhwatop_org(data: str) -> bool:
-    return "Next" in data and "Show more" not in data
-
-
-def kunmanga_com(data: str) -> bool:
-    return "chapters_selectbox_holder" in data and "LATEST MANGA RELEASES" not in data
-
-
-def harimanga_me(data: str) -> bool:
-    return '"prev":"Prev","next":"Next' in data and "#manga-discussion" not in data
-
-
-def harimanga_com(data: str) -> bool:
-    return '"prev":"Prev","next":"Next' in data and "#manga-discussion" not in data
-
-
-def oniscan_com(data: str) -> bool:
-    return "next-nav" in data and "Last Releases" not in data
-
-
-def mangakatana_com(data: str) -> bool:
-    return "send_img_err = false" in data and 'prev" disabled="disabled' not in data
-
-
-# Special functions
-
-
-def true_(_: str) -> bool:
-    return True
+    has: tuple[str, ...] = ()
+    lacks: tuple[str, ...] = ()
+    by_status: bool = False
+    max_bytes: int = 2 << 20
 
 
 #
@@ -74,32 +31,32 @@ def true_(_: str) -> bool:
 #
 
 
-domains: dict[str, Callable[[str], bool]] = {
-    "mangakakalot.gg": mangakakalot_gg,
+domains: dict[str, Rule] = {
+    "mangakakalot.gg": Rule(has=("next", "PREV CHAPTER"), lacks=("moveToListChapter",)),
     #
-    "toonclash.com": toonclash_com,
-    "mangaclash.com": mangaclash_com,
-    "mangabuddy.com": mangabuddy_com,
+    "toonclash.com": Rule(has=("cursorNext",), lacks=("Alternative",)),
+    "mangaclash.com": Rule(has=("cursorNext",), lacks=("Alternative",)),
+    "mangabuddy.com": Rule(has=('"Next chapter"', '"Previous chapter"')),
     #
-    "harimanga.com": harimanga_com,
-    "harimanga.me": harimanga_me,
+    "harimanga.com": Rule(has=('"prev":"Prev","next":"Next',), lacks=("#manga-discussion",)),
+    "harimanga.me": Rule(has=('"prev":"Prev","next":"Next',), lacks=("#manga-discussion",)),
     #
-    "manhuaus.com": manhuaus_com,
-    "manhuaus.org": manhuaus_org,
+    "manhuaus.com": Rule(has=("btn prev_page",), lacks=("Show more",)),
+    "manhuaus.org": Rule(has=("prev_page",), lacks=("main-menu",)),
     #
-    "mangakatana.com": mangakatana_com,
-    "manhwatop.com": manhwatop_com,
-    "manhuatop.org": manhwatop_org,
-    "kunmanga.com": kunmanga_com,
-    "oniscan.com": oniscan_com,
+    "mangakatana.com": Rule(has=("send_img_err = false",), lacks=('prev" disabled="disabled',)),
+    "manhwatop.com": Rule(has=("Next",), lacks=("Show more",)),
+    "manhuatop.org": Rule(has=("Next",), lacks=("Show more",)),
+    "kunmanga.com": Rule(has=("chapters_selectbox_holder",), lacks=("LATEST MANGA RELEASES",)),
+    "oniscan.com": Rule(has=("next-nav",), lacks=("Last Releases",)),
     #
     # Returns 404 if no new chapter
     #
-    "manhwabuddy.com": true_,
-    "kingofshojo.com": true_,
-    "rackusreads.com": true_,
-    "mangareader.to": true_,
-    "natomanga.com": true_,
-    "rawkuma.net": true_,
-    "mgeko.cc": true_,
+    "manhwabuddy.com": Rule(by_status=True),
+    "kingofshojo.com": Rule(by_status=True),
+    "rackusreads.com": Rule(by_status=True),
+    "mangareader.to": Rule(by_status=True),
+    "natomanga.com": Rule(by_status=True),
+    "rawkuma.net": Rule(by_status=True),
+    "mgeko.cc": Rule(by_status=True),
 }
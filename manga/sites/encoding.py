@@ -0,0 +1,18 @@
+from urllib3.util.request import ACCEPT_ENCODING
+
+# Content codings, most compact first
+_preference: tuple[str, ...] = ("zstd", "br", "gzip", "deflate")
+# What urllib3 can decode; aiohttp decodes the same codings with the same modules
+# brotli needs brotli or brotlicffi installed, zstd needs a python built with compression.zstd
+_decodable: frozenset[str] = frozenset(ACCEPT_ENCODING.split(","))
+
+
+def _accept_encoding() -> str:
+    """
+    An Accept-Encoding header offering every decodable content coding, ranked most compact first
+    """
+    offered: list[str] = [i for i in _preference if i in _decodable]
+    return ", ".join(f"{i};q={1 - n / 10:.1f}" if n else i for n, i in enumerate(offered))
+
+
+accept_encoding: str = _accept_encoding()
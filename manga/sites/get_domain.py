@@ -0,0 +1,35 @@
+from functools import lru_cache
+
+from tldextract.remote import lenient_netloc
+import tldextract
+
+from .domains import domains
+
+# Only ever use the public suffix list snapshot bundled with tldextract, so the network is never touched
+_extract = tldextract.TLDExtract(cache_dir=None, suffix_list_urls=(), fallback_to_snapshot=True)
+# The hosts of known domains, which map straight to them
+_known: dict[str, str] = {**{i: i for i in domains}, **{f"www.{i}": i for i in domains}}
+# The number of labels in each known domain, longest first
+_labels: tuple[int, ...] = tuple(sorted({i.count(".") + 1 for i in domains}, reverse=True))
+
+
+@lru_cache(maxsize=1 << 12)
+def _domain(host: str) -> str:
+    """
+    The registrable domain of host
+    Subdomains of known domains are resolved without consulting the public suffix list
+    """
+    for i in _labels:
+        if (tail := ".".join(host.rsplit(".", i)[-i:])) in domains:
+            return tail
+    info: tldextract.tldextract.ExtractResult = _extract(host)
+    return f"{info.domain}.{info.suffix}"
+
+
+def get_domain(url: str) -> str:
+    """
+    Extract the domain portion of a URL
+    Other than those of known domains, the domains of hosts are memoized
+    """
+    host: str = lenient_netloc(url)
+    return _known.get(host) or _domain(host)
@@ -0,0 +1,77 @@
+from collections import Counter
+from pathlib import Path
+import threading
+import json
+
+
+class HeadSupport:
+    """
+    Per-domain record, stored on disk, of whether a status-only domain's HEAD responses may replace GETs
+    A HEAD is trusted once it agreed with a GET of the same page on both a found and a missing chapter,
+    and never disagreed; a domain whose HEAD and GET disagree on disagreements pages is only sent GETs
+    Only pages whose GET and HEAD both got a 2xx or a 404 are compared, as other statuses are often transient
+    Until a domain is decided, at most checks of its pages each run are also requested with HEAD to compare
+    If not enabled, nothing is learned and only GETs are sent
+    """
+
+    def __init__(self, path: Path = Path.home() / ".cache/manga_scrape/head_support.json") -> None:
+        self.path: Path = path
+        self.enabled: bool = True
+        self.disagreements: int = 3
+        self.checks: int = 8
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, bool | int]] | None = None
+        self._checked: Counter[str] = Counter()
+
+    def _stats(self, domain: str) -> dict[str, bool | int]:
+        if self._data is None:
+            self._data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        return self._data.setdefault(domain, {"found": False, "missing": False, "disagreed": 0})
+
+    def trusted(self, domain: str) -> bool | None:
+        """
+        Return true if HEAD may replace GET for domain, false if it may not
+        Returns None if that is not yet known and this page should be checked, which counts towards checks
+        """
+        if not self.enabled:
+            return False
+        with self._lock:
+            stats = self._stats(domain)
+            if stats["disagreed"] >= self.disagreements:
+                return False
+            if stats["found"] and stats["missing"] and not stats["disagreed"]:
+                return True
+            if self._checked[domain] >= self.checks:
+                return False
+            self._checked[domain] += 1
+            return None
+
+    def compare(self, domain: str, get: int, head: int) -> None:
+        """
+        Record the statuses a GET and a HEAD of the same page of domain got
+        """
+        comparable = lambda status: 200 <= status < 300 or status == 404
+        if not self.enabled or not comparable(get) or not comparable(head):
+            return
+        with self._lock:
+            stats = self._stats(domain)
+            if (get == 404) == (head == 404):
+                stats["missing" if get == 404 else "found"] = True
+                return
+            stats["disagreed"] += 1
+            if stats["disagreed"] == self.disagreements:
+                print(f"HEAD and GET disagree for {domain}; only GET will be used")
+
+    def save(self) -> None:
+        """
+        Write what has been learned to disk
+        """
+        with self._lock:
+            if self._data is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp: Path = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self._data, indent=1, sort_keys=True))
+                tmp.replace(self.path)
+
+
+heads = HeadSupport()
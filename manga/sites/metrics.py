@@ -0,0 +1,245 @@
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, NamedTuple
+from collections import Counter
+from pathlib import Path
+import threading
+import json
+import math
+import time
+
+if TYPE_CHECKING:
+    from typing import Any
+
+
+_quantiles: tuple[float, ...] = (0.5, 0.95, 0.99)
+
+
+class Transfer(NamedTuple):
+    """
+    The body of a response: bytes read off the wire, the bytes they decoded to, and its content coding
+    """
+
+    wire: int
+    decoded: int
+    encoding: str
+
+
+def _percentile(xs: list[float], q: float) -> float:
+    """
+    The nearest rank q'th quantile of sorted xs
+    """
+    return xs[max(0, math.ceil(q * len(xs)) - 1)] if xs else 0.0
+
+
+@dataclass
+class DomainMetrics:
+    """
+    Every request made to a single domain
+    A status of None means no response was received, such as on a timeout
+    Bytes are counted as read off the wire, before decompression, and once decoded
+    """
+
+    latencies: list[float] = field(default_factory=list)
+    statuses: Counter[int | None] = field(default_factory=Counter)
+    bytes: int = 0
+    decoded: int = 0
+    encodings: Counter[str] = field(default_factory=Counter)
+    wait: float = 0.0
+    retries: int = 0
+    backoff: float = 0.0
+
+    def report(self) -> dict[str, Any]:
+        xs: list[float] = sorted(self.latencies)
+        return {
+            "requests": len(xs),
+            "statuses": {"error" if i is None else str(i): k for i, k in sorted(self.statuses.items(), key=str)},
+            "bytes": self.bytes,
+            "decoded_bytes": self.decoded,
+            "encodings": dict(sorted(self.encodings.items())),
+            "retries": self.retries,
+            "backoff_seconds": self.backoff,
+            "wait_seconds": self.wait,
+            "latency_seconds": {
+                **{f"p{round(q * 100)}": _percentile(xs, q) for q in _quantiles},
+                "max": xs[-1] if xs else 0.0,
+                "total": sum(xs),
+            },
+        }
+
+
+class Metrics:
+    """
+    Thread-safe instrumentation of every request made this run, summarized per domain
+    Each request records its status, latency, body and how long it waited on the rate limiter
+    Each retry records how long it slept in backoff first
+    A warm-up before the sweep is recorded on its own, as its time is not spent on any request
+    A run is timed from when the tool calls begin, or else from when this was made
+    Reports are saved as JSON and, optionally, as a Prometheus textfile
+    """
+
+    def __init__(self, directory: Path = Path.home() / ".cache/manga_scrape/reports") -> None:
+        self.directory: Path = directory
+        self._lock = threading.Lock()
+        self._domains: dict[str, DomainMetrics] = {}
+        self._start: float = time.time()
+        self._warm_up: dict[str, float] | None = None
+
+    def begin(self) -> None:
+        """
+        Start a new run: forget what was recorded so far and time the run from now
+        """
+        with self._lock:
+            self._domains.clear()
+            self._start = time.time()
+            self._warm_up = None
+
+    def _domain(self, domain: str) -> DomainMetrics:
+        if (ret := self._domains.get(domain)) is None:
+            ret = self._domains[domain] = DomainMetrics()
+        return ret
+
+    def record(self, domain: str, status: int | None, latency: float, body: Transfer | None, wait: float) -> None:
+        """
+        Record a request to domain which took latency seconds after waiting wait seconds to be allowed
+        body is None if no response was received
+        """
+        with self._lock:
+            d = self._domain(domain)
+            d.latencies.append(latency)
+            d.statuses[status] += 1
+            d.wait += wait
+            if body is not None:
+                d.bytes += body.wire
+                d.decoded += body.decoded
+                d.encodings[body.encoding] += 1
+
+    def retry(self, domain: str, backoff: float) -> None:
+        """
+        Record a retry of a request to domain made after sleeping backoff seconds
+        """
+        with self._lock:
+            d = self._domain(domain)
+            d.retries += 1
+            d.backoff += backoff
+
+    # pylint: disable=too-many-arguments
+    def warm_up(self, hosts: int, resolved: int, connected: int, resolving: float, connecting: float) -> None:
+        """
+        Record a warm-up which took resolving seconds to resolve hosts then connecting seconds to connect to them
+        """
+        with self._lock:
+            self._warm_up = {
+                "hosts": hosts,
+                "resolved": resolved,
+                "connected": connected,
+                "resolve_seconds": resolving,
+                "connect_seconds": connecting,
+                "seconds": resolving + connecting,
+            }
+
+    def report(self) -> dict[str, Any]:
+        """
+        The metrics of this run as JSON
+        """
+        with self._lock:
+            domains = {i: k.report() for i, k in sorted(self._domains.items())}
+            total = DomainMetrics()
+            for i in self._domains.values():
+                total.latencies += i.latencies
+                total.statuses += i.statuses
+                total.bytes += i.bytes
+                total.decoded += i.decoded
+                total.encodings += i.encodings
+                total.wait += i.wait
+                total.retries += i.retries
+                total.backoff += i.backoff
+            warm_up = self._warm_up
+        duration: float = time.time() - self._start
+        return {
+            "start": self._start,
+            "duration": duration,
+            "warm_up": warm_up,
+            "total": total.report(),
+            "domains": domains,
+        }
+
+    def save(self, path: Path | None = None, name: str = "run") -> Path:
+        """
+        Save the report of this run to path as JSON, by default to a new file named after name in directory
+        Return where the report was saved
+        """
+        if path is None:
+            path = self.directory / f"{name}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(self._start))}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.report(), indent=1))
+        return path
+
+    def prometheus(self, path: Path) -> None:
+        """
+        Save the report of this run to path in the Prometheus textfile format
+        The file is replaced atomically so a collector never reads a partial file
+        """
+        lines: list[str] = []
+
+        def metric(name: str, kind: str, doc: str, values: list[tuple[str, float]]) -> None:
+            lines.extend((f"# HELP manga_{name} {doc}", f"# TYPE manga_{name} {kind}"))
+            lines.extend(f"manga_{name}{{{labels}}} {value}" for labels, value in values)
+
+        run = self.report()
+        report = run["domains"]
+        d = lambda domain: f'domain="{domain}"'
+        requests = [(f'{d(i)},status="{s}"', n) for i, k in report.items() for s, n in k["statuses"].items()]
+        metric("requests_total", "counter", "Requests made, by domain and status", requests)
+        latency: list[tuple[str, float]] = []
+        for i, k in report.items():
+            latency += [(f'{d(i)},quantile="{q}"', k["latency_seconds"][f"p{round(q * 100)}"]) for q in _quantiles]
+        metric("request_latency_seconds", "summary", "The latency of requests, by domain", latency)
+        for i, k in report.items():
+            lines.append(f"manga_request_latency_seconds_sum{{{d(i)}}} {k['latency_seconds']['total']}")
+            lines.append(f"manga_request_latency_seconds_count{{{d(i)}}} {k['requests']}")
+        encodings = [(f'{d(i)},encoding="{e}"', n) for i, k in report.items() for e, n in k["encodings"].items()]
+        metric("responses_total", "counter", "Responses read, by domain and content coding", encodings)
+        for name, key, doc in (
+            ("bytes_total", "bytes", "Bytes read off the wire, by domain"),
+            ("decoded_bytes_total", "decoded_bytes", "Bytes read once decompressed, by domain"),
+            ("retries_total", "retries", "Requests retried, by domain"),
+            ("backoff_seconds_total", "backoff_seconds", "Seconds slept in backoff before retries, by domain"),
+            ("wait_seconds_total", "wait_seconds", "Seconds requests waited on the rate limiter, by domain"),
+        ):
+            metric(name, "counter", doc, [(d(i), k[key]) for i, k in report.items()])
+        if (warm_up := run["warm_up"]) is not None:
+            phases = [(f'phase="{i}"', warm_up[f"{i}_seconds"]) for i in ("resolve", "connect")]
+            metric("warm_up_seconds", "gauge", "Seconds spent warming up before the sweep, by phase", phases)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp: Path = path.with_name(path.name + ".tmp")
+        tmp.write_text("\n".join(lines) + "\n")
+        tmp.replace(path)
+
+    def summary(self) -> str:
+        """
+        A short summary of this run, naming the domains with the slowest requests and those which read the most
+        """
+        report = self.report()
+        total = report["total"]
+        mib = lambda n: f"{n / (1 << 20):.1f} MiB"
+        ratio = lambda k: f"{k['decoded_bytes'] / k['bytes']:.1f}x" if k["bytes"] else "-"
+        slowest = sorted(report["domains"].items(), key=lambda i: -i[1]["latency_seconds"]["p95"])[:3]
+        heaviest = sorted(report["domains"].items(), key=lambda i: -i[1]["bytes"])[:3]
+        ret: str = (
+            f"Made {total['requests']} requests in {report['duration']:.1f}s, "
+            f"read {mib(total['bytes'])} ({mib(total['decoded_bytes'])} decompressed, {ratio(total)}), "
+            f"retried {total['retries']} times and slept {total['backoff_seconds']:.1f}s in backoff"
+        )
+        if (warm_up := report["warm_up"]) is not None:
+            ret += (
+                f"\nWarmed up in {warm_up['seconds']:.1f}s before the sweep: resolved {warm_up['resolved']} "
+                f"and connected to {warm_up['connected']} of {warm_up['hosts']} hosts"
+            )
+        if slowest:
+            ret += "\nSlowest p95: " + ", ".join(f"{i} ({k['latency_seconds']['p95']:.2f}s)" for i, k in slowest)
+        if total["bytes"]:
+            ret += "\nMost read: " + ", ".join(f"{i} ({mib(k['bytes'])}, {ratio(k)})" for i, k in heaviest)
+        return ret
+
+
+metrics = Metrics()
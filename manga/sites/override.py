@@ -0,0 +1,48 @@
+from urllib.parse import urlsplit, urlunsplit
+from pathlib import Path
+
+
+class HostOverride:
+    """
+    Sends every request to a single host, such as manga.tools.mock_sites, instead of the site's own
+    The original host is kept in the Host header so the server can tell which site was requested
+    What is learned meanwhile is about that host, not the sites, so stores are kept apart, see scratch
+    """
+
+    def __init__(self) -> None:
+        self.scheme: str = ""
+        self.netloc: str = ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.netloc)
+
+    def configure(self, host: str | None) -> None:
+        """
+        Send requests to host, given as host:port or scheme://host:port; None restores the real hosts
+        Without a scheme, plain http is used
+        """
+        if not host:
+            self.scheme = self.netloc = ""
+            return
+        parts = urlsplit(host if "://" in host else f"http://{host}")
+        assert parts.netloc, f"Invalid host: {host}"
+        self.scheme, self.netloc = parts.scheme, parts.netloc
+
+    def scratch(self, path: Path) -> Path:
+        """
+        Return where a store usually kept at path should be kept, which while enabled is a separate directory
+        """
+        return path.parent / "override" / path.name if self.enabled else path
+
+    def rewrite(self, url: str) -> tuple[str, dict[str, str]]:
+        """
+        Return the URL to request in place of url and the headers needed to do so
+        """
+        if not self.enabled:
+            return url, {}
+        parts = urlsplit(url)
+        return urlunsplit((self.scheme, self.netloc, parts.path, parts.query, "")), {"Host": parts.netloc}
+
+
+override = HostOverride()
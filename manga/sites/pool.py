@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+import threading
+
+from requests.adapters import HTTPAdapter
+import requests
+
+from .encoding import accept_encoding
+
+
+@dataclass
+class PoolStats:
+    """
+    Connection usage of a single domain
+    """
+
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def reused(self) -> int:
+        return self.requests - self.connections
+
+
+class SessionPool:
+    """
+    A thread-safe pool of keep-alive sessions, one per domain
+    Each session keeps up to pool_size idle connections per host alive for reuse
+    Each session offers every content coding it can decompress
+    """
+
+    def __init__(self, pool_size: int = 32) -> None:
+        self._lock = threading.Lock()
+        self._sessions: dict[str, requests.Session] = {}
+        self._pool_size: int = pool_size
+
+    def _new(self) -> requests.Session:
+        ret = requests.Session()
+        ret.headers["Accept-Encoding"] = accept_encoding
+        adapter = HTTPAdapter(pool_maxsize=self._pool_size)
+        ret.mount("http://", adapter)
+        ret.mount("https://", adapter)
+        return ret
+
+    def session(self, domain: str) -> requests.Session:
+        """
+        Get the session for domain
+        """
+        with self._lock:
+            if (ret := self._sessions.get(domain)) is None:
+                ret = self._sessions[domain] = self._new()
+            return ret
+
+    def resize(self, pool_size: int) -> None:
+        """
+        Set the number of connections kept alive per host; existing sessions are closed
+        """
+        assert pool_size > 0, "Pool size must be positive"
+        with self._lock:
+            self._pool_size = pool_size
+            old, self._sessions = self._sessions, {}
+        for i in old.values():
+            i.close()
+
+    def stats(self) -> dict[str, PoolStats]:
+        """
+        Return the number of requests made and connections opened per domain
+        """
+        with self._lock:
+            sessions = dict(self._sessions)
+        ret: dict[str, PoolStats] = {}
+        for domain, session in sessions.items():
+            ret[domain] = PoolStats()
+            for adapter in {id(i): i for i in session.adapters.values()}.values():
+                if isinstance(adapter, HTTPAdapter):
+                    for key in adapter.poolmanager.pools.keys():
+                        if (p := adapter.poolmanager.pools.get(key)) is not None:
+                            ret[domain].requests += p.num_requests
+                            ret[domain].connections += p.num_connections
+        return ret
+
+    def summary(self) -> str:
+        """
+        A one line summary of connection reuse across every domain
+        """
+        total = PoolStats()
+        for i in self.stats().values():
+            total.requests += i.requests
+            total.connections += i.connections
+        ratio: float = total.reused / total.requests if total.requests else 0.0
+        return f"Made {total.requests} requests over {total.connections} connections ({ratio:.0%} reused)"
+
+
+pool = SessionPool()
@@ -0,0 +1,124 @@
+from email.utils import parsedate_to_datetime
+from datetime import datetime, UTC
+import threading
+import asyncio
+import time
+
+
+def retry_after(value: str | None) -> float | None:
+    """
+    Parse the value of a Retry-After header into a number of seconds, if possible
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(UTC)).total_seconds())
+    except TypeError, ValueError:
+        return None
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilling at rate tokens per second, holding at most burst tokens
+    When throttled the bucket is paused and its rate is halved; successes slowly restore the rate
+    """
+
+    def __init__(self, rate: float, burst: int) -> None:
+        assert rate > 0 and burst > 0, "Rate and burst must be positive"
+        self.max_rate: float = rate
+        self.rate: float = rate
+        self.burst: int = burst
+        self._tokens: float = burst
+        self._updated: float = time.monotonic()
+        self._paused_until: float = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Claim a token; return how many seconds the caller must wait before using it
+        """
+        with self._lock:
+            now: float = time.monotonic()
+            start: float = max(now, self._paused_until)
+            self._tokens = min(self.burst, self._tokens + (start - self._updated) * self.rate)
+            self._updated = start
+            self._tokens -= 1
+            return start - now + max(0.0, -self._tokens / self.rate)
+
+    def refund(self) -> None:
+        """
+        Return a claimed token which was not used
+        """
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + 1)
+
+    def throttle(self, pause: float) -> None:
+        """
+        The site asked us to slow down: pause the bucket for pause seconds and halve its rate
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+            self._updated = max(self._updated, self._paused_until)
+            self.rate = max(self.rate / 2, self.max_rate / 64)
+            self._tokens = min(self._tokens, 0.0)
+
+    def success(self) -> None:
+        """
+        A request succeeded: additively restore the rate towards max_rate
+        """
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 16)
+
+
+class RateLimiter:
+    """
+    A token bucket per domain; every request should acquire from its domain's bucket first
+    """
+
+    def __init__(self, rate: float = 8.0, burst: int = 8) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, TokenBucket] = {}
+        self.configure(rate, burst)
+
+    def configure(self, rate: float, burst: int) -> None:
+        """
+        Set the rate (requests per second) and burst of every domain; existing buckets are reset
+        """
+        assert rate > 0 and burst > 0, "Rate and burst must be positive"
+        with self._lock:
+            self._rate: float = rate
+            self._burst: int = burst
+            self._buckets.clear()
+
+    def bucket(self, domain: str) -> TokenBucket:
+        with self._lock:
+            if (ret := self._buckets.get(domain)) is None:
+                ret = self._buckets[domain] = TokenBucket(self._rate, self._burst)
+            return ret
+
+    def acquire(self, domain: str) -> None:
+        """
+        Block until a request may be made to domain
+        """
+        if (wait := self.bucket(domain).reserve()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, domain: str) -> None:
+        """
+        Wait until a request may be made to domain
+        If cancelled while waiting, the token is returned to the bucket
+        """
+        bucket = self.bucket(domain)
+        if (wait := bucket.reserve()) > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                bucket.refund()
+                raise
+
+
+limiter = RateLimiter()
@@ -1,12 +1,19 @@
-from collections.abc import Callable
+from typing import NamedTuple
 from random import choice
-from time import sleep
+from time import monotonic, sleep
 
-import tldextract
 import requests
 
 from .unknown_domain import UnknownDomain
-from .domains import domains
+from .get_domain import get_domain
+from .domains import Rule, domains
+from .matcher import StreamMatcher, matches
+from .rate_limit import limiter, retry_after
+from .override import override
+from .metrics import Transfer, metrics
+from .head import heads
+from .cache import cache
+from .pool import pool
 
 _agents = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
@@ -19,51 +26,154 @@ _agents = (
 )
 
 
-def get_domain(url: str) -> str:
+_chunk_size: int = 16 << 10
+
+
+def _evaluate(response: requests.Response, rule: Rule, stream: bool) -> tuple[bool, int]:
     """
-    Extract the domain portion of a URL
+    Evaluate rule against the body of response; return the verdict and the number of decompressed bytes read
+    If stream, the body is decompressed and read only until the verdict is decided or rule.max_bytes is reached
     """
-    info: tldextract.tldextract.ExtractResult = tldextract.extract(url)
-    return f"{info.domain}.{info.suffix}"
+    if not stream:
+        return rule.by_status or matches(rule, response.content), len(response.content)
+    if rule.by_status:
+        return True, 0
+    matcher = StreamMatcher(rule)
+    read: int = 0
+    for chunk in response.iter_content(_chunk_size):
+        read += len(chunk)
+        if matcher.feed(chunk) is not None:
+            break
+    return matcher.end(), read
 
 
-def _test(url: str, fn: Callable[[str], bool], timeout: float, timeout_retries: int, base_delay: float) -> bool:
+class Retry(NamedTuple):
     """
-    Return true if the given chapter is found
-    If a timeout occurs, retries at most timeout_retries times; sleeps in between
+    Why a request should be retried and, if the site said, how many seconds to wait first
+    If throttled, the site asked us to slow down
     """
-    session = requests.Session()
-    session.headers.update({"User-Agent": choice(_agents)})
+
     what: str
+    pause: float | None = None
+    throttled: bool = False
+
+
+# pylint: disable=too-many-arguments
+def _request(
+    url: str, domain: str, rule: Rule, timeout: float, stream: bool, method: str = "GET"
+) -> tuple[bool | Retry, int | None]:
+    """
+    Request url once, once the rate limiter allows
+    Return the verdict, or why the request should be retried, and the status of the response if one was received
+    method may be HEAD only if rule is status-only, as a HEAD has no body to evaluate
+    Connections are reused from the domain's pooled session
+    Cached pages are revalidated with a conditional GET and reuse their cached verdict if unmodified
+    A HEAD has nothing to save by revalidating, so it neither uses nor updates the cache
+    The request is recorded in metrics whether or not it succeeds
+    The session offers every content coding it can decompress, see encoding.py
+    """
+    session: requests.Session = pool.session(domain)
+    entry = cache.lookup(url, rule) if method == "GET" else None
+    target, host = override.rewrite(url)
+    headers: dict[str, str] = {"User-Agent": choice(_agents), **host, **(entry.headers() if entry else {})}
+    queued: float = monotonic()
+    limiter.acquire(domain)
+    start: float = monotonic()
+    response: requests.Response | None = None
+    decoded: int = 0
     try:
-        response = session.get(url, timeout=timeout)
-        if response.ok:
-            return fn(response.text)
-        if response.status_code == 404:
-            return False
-        if response.status_code not in (429, 503):
-            print(f"Got {response.status_code} from GET {url}")
-            return False
-        what = f"Got {response.status_code}"
+        # A HEAD has no body to stream, and closing a streamed response would drop its kept-alive connection
+        stream = stream and method == "GET"
+        with session.request(method, target, headers=headers, timeout=timeout, stream=stream) as response:
+            status: int = response.status_code
+            if status in (429, 503):
+                pause: float | None = retry_after(response.headers.get("Retry-After"))
+                return Retry(f"Got {status}", pause, True), status
+            limiter.bucket(domain).success()
+            if status == 304 and entry is not None:
+                return entry.verdict, status
+            if response.ok:
+                ret, decoded = _evaluate(response, rule, stream)
+                if method == "GET":
+                    cache.store(url, rule, response.headers, ret)
+                return ret, status
+            if status != 404:
+                print(f"Got {status} from {method} {url}")
+            return False, status
     except requests.exceptions.ReadTimeout:
-        what = "ReadTimeout"
-    # Timeout or too many requests error at this point
-    if timeout_retries <= 0:
-        raise RuntimeError(what)
-    if base_delay > 60:
-        print(f"{what} for: {url}: Sleeping for {base_delay} seconds then trying again")
-    sleep(base_delay)
-    return _test(url, fn, timeout, timeout_retries - 1, min(base_delay * 2, 960.0))
+        return Retry("ReadTimeout"), None
+    finally:
+        recorded: int | None = None
+        body: Transfer | None = None
+        if response is not None:
+            recorded = response.status_code
+            decoded = decoded if stream else len(response.content)  # Unless streamed, every body is read
+            body = Transfer(response.raw.tell(), decoded, response.headers.get("Content-Encoding", "identity"))
+        metrics.record(domain, recorded, monotonic() - start, body, start - queued)
+
+
+# pylint: disable=too-many-arguments
+def _get(url: str, domain: str, rule: Rule, timeout: float, stream: bool, method: str = "GET") -> bool | Retry:
+    """
+    The verdict of _request
+    """
+    return _request(url, domain, rule, timeout, stream, method)[0]
+
+
+def _status_only(url: str, domain: str, rule: Rule, timeout: float, stream: bool) -> bool | Retry:
+    """
+    Request url, a page of a status-only domain, with HEAD if the domain's HEAD responses are trusted, else GET
+    While that is not yet known, the page may also be requested with HEAD to compare their statuses, see HeadSupport
+    """
+    if (trusted := heads.trusted(domain)) is not None:
+        return _get(url, domain, rule, timeout, stream, "HEAD" if trusted else "GET")
+    got, status = _request(url, domain, rule, timeout, stream)
+    if isinstance(got, Retry) or status is None:
+        return got
+    try:
+        if (head := _request(url, domain, rule, timeout, stream, "HEAD")[1]) is not None:
+            heads.compare(domain, status, head)
+    except requests.exceptions.RequestException:
+        pass  # The check is retried on a later page
+    return got
 
 
-def test(url: str, timeout: float = 7.5, timeout_retries: int = 0, base_delay: float = 7.5) -> bool:
+# pylint: disable=too-many-arguments
+def _test(url: str, rule: Rule, timeout: float, timeout_retries: int, base_delay: float, stream: bool) -> bool:
     """
     Return true if the given chapter is found
     If a timeout occurs, retries at most timeout_retries times; sleeps in between
+    If the site throttles us, the whole domain is paused for its Retry-After, or else for the backoff delay
+    """
+    domain: str = get_domain(url)
+    get = _status_only if rule.by_status else _get
+    while isinstance(got := get(url, domain, rule, timeout, stream), Retry):
+        delay: float = base_delay if got.pause is None else got.pause
+        if got.throttled:
+            limiter.bucket(domain).throttle(delay)
+        if timeout_retries <= 0:
+            raise RuntimeError(got.what)
+        if delay > 60:
+            print(f"{got.what} for: {url}: Sleeping for {delay} seconds then trying again")
+        metrics.retry(domain, 0.0 if got.throttled else delay)
+        if not got.throttled:
+            sleep(delay)
+        timeout_retries -= 1
+        base_delay = min(base_delay * 2, 960.0)
+    return got
+
+
+def test(
+    url: str, timeout: float = 7.5, timeout_retries: int = 0, base_delay: float = 7.5, stream: bool = True
+) -> bool:
+    """
+    Return true if the given chapter is found
+    If a timeout occurs or the site throttles us, retries at most timeout_retries times; sleeps in between
+    If stream, the connection is closed as soon as the page's verdict is decided
     """
     domain: str = get_domain(url)
     try:
-        fn: Callable[[str], bool] = domains[domain]
+        rule: Rule = domains[domain]
     except KeyError:
         raise UnknownDomain(url)  # pylint: disable=raise-missing-from
-    return _test(url, fn, timeout, timeout_retries, base_delay)
+    return _test(url, rule, timeout, timeout_retries, base_delay, stream)
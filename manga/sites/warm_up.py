@@ -0,0 +1,119 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+from random import choice
+import threading
+import socket
+import time
+
+from urllib3.util.connection import allowed_gai_family
+import requests
+
+from .get_domain import get_domain
+from .rate_limit import limiter
+from .override import override
+from .metrics import Transfer, metrics
+from .test import _agents
+from .pool import pool
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from typing import Any
+
+    from .async_test import Engine
+
+
+class Resolver:
+    """
+    A thread-safe memo of DNS answers which lasts a sweep
+    Within a with block, every lookup made through socket.getaddrinfo is answered from it after the first;
+    on exit socket.getaddrinfo is restored and the answers are forgotten
+    Failed lookups are not remembered, so they are retried
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._answers: dict[tuple[Any, ...], list[Any]] = {}
+        self._getaddrinfo = socket.getaddrinfo
+
+    def getaddrinfo(self, *args: Any, **kwargs: Any) -> list[Any]:
+        key = (*args, *sorted(kwargs.items()))
+        with self._lock:
+            if (ret := self._answers.get(key)) is not None:
+                return ret
+        ret = self._getaddrinfo(*args, **kwargs)
+        with self._lock:
+            self._answers[key] = ret
+        return ret
+
+    def resolve(self, host: str, port: int) -> bool:
+        """
+        Look up host as urllib3 will when it connects to host:port; return false if the lookup failed
+        """
+        try:
+            self.getaddrinfo(host, port, allowed_gai_family(), socket.SOCK_STREAM)
+        except OSError:
+            return False
+        return True
+
+    def __enter__(self) -> Resolver:
+        self._getaddrinfo = socket.getaddrinfo
+        socket.getaddrinfo = self.getaddrinfo
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        socket.getaddrinfo = self._getaddrinfo
+        with self._lock:
+            self._answers.clear()
+
+
+resolver = Resolver()
+
+
+def _resolve(origin: str) -> bool:
+    parts = urlsplit(override.rewrite(origin)[0])
+    return resolver.resolve(parts.hostname or "", parts.port or (443 if parts.scheme == "https" else 80))
+
+
+def _connect(origin: str, timeout: float) -> bool:
+    """
+    Open a pooled connection to the host of origin with a HEAD of its root; return false on failure
+    The HEAD is rate limited and recorded in metrics like any other request
+    """
+    domain: str = get_domain(origin)
+    target, host = override.rewrite(origin)
+    headers: dict[str, str] = {"User-Agent": choice(_agents), **host}
+    queued: float = time.monotonic()
+    limiter.acquire(domain)
+    start: float = time.monotonic()
+    status: int | None = None
+    body: Transfer | None = None
+    try:
+        with pool.session(domain).head(target, headers=headers, timeout=timeout, allow_redirects=False) as r:
+            status = r.status_code
+            body = Transfer(0, 0, r.headers.get("Content-Encoding", "identity"))
+            return True
+    except requests.exceptions.RequestException:
+        return False
+    finally:
+        metrics.record(domain, status, time.monotonic() - start, body, start - queued)
+
+
+def warm_up(urls: Iterable[str], engine: Engine | None = None, workers: int = 32, timeout: float = 7.5) -> None:
+    """
+    Before a sweep of urls, resolve every distinct host in parallel, then open one pooled connection to each
+    The sweep's first requests then need neither DNS nor TCP and TLS setup, which would otherwise all happen at once
+    Connections are opened by engine if given, else in the threaded engine's session pool
+    Hosts that fail are left to the sweep to report; each HEAD and the time taken are recorded in metrics
+    The sweep only reuses the DNS answers if both are made within the same with resolver block
+    """
+    origins: set[str] = {f"{i.scheme}://{i.netloc}/" for i in map(urlsplit, urls)}
+    start: float = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="manga-warm-up") as executor:
+        resolved: int = sum(executor.map(_resolve, origins))
+        resolving: float = time.monotonic() - start
+        if engine is None:
+            connected: int = sum(executor.map(lambda i: _connect(i, timeout), origins))
+        else:
+            connected = sum(i.result() for i in [engine.run(engine.warm(k, timeout)) for k in origins])
+    metrics.warm_up(len(origins), resolved, connected, resolving, time.monotonic() - start - resolving)
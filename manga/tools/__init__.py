@@ -1,7 +1,41 @@
-from .unnumbered_helper import unnumbered_helper
-from .inc_chapter import inc_chapter
-from .no_unicode import no_unicode
-from .test_sites import test_sites
-from .up_number import up_number
-from .open_new import open_new
-from .guess import guess
+"""
+Each tool is imported when first accessed, so that running one tool does not import every tool's dependencies
+"""
+
+from typing import TYPE_CHECKING
+from importlib import import_module
+
+if TYPE_CHECKING:
+    from .unnumbered_helper import unnumbered_helper
+    from .library_daemon import library_daemon
+    from .inc_chapter import inc_chapter
+    from .mock_sites import mock_sites
+    from .no_unicode import no_unicode
+    from .test_sites import test_sites
+    from .up_number import up_number
+    from .open_new import open_new
+    from .guess import guess
+    from typing import Any
+
+__all__ = (
+    "unnumbered_helper",
+    "library_daemon",
+    "inc_chapter",
+    "mock_sites",
+    "no_unicode",
+    "test_sites",
+    "up_number",
+    "open_new",
+    "guess",
+)
+
+
+def __getattr__(name: str) -> Any:
+    """
+    Import the tool name, each of which is defined in the module of the same name
+    """
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    ret = getattr(import_module(f".{name}", __name__), name)
+    globals()[name] = ret
+    return ret
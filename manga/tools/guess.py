@@ -1,13 +1,16 @@
-from collections.abc import Sequence, Callable
+from collections.abc import Sequence, Callable, Iterable, Iterator
 from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 import collections
 import platform
 import argparse
 import sys
 import re
 
-from manga.utils import split_on_num, extract_url, lsf, mv
+from manga.utils import split_on_num, extract_url, library, candidates, mv, scrub, scrub_many
+
+if TYPE_CHECKING:
+    from manga.utils import Record
 
 # Config
 TOLERANCE: int = 20
@@ -28,11 +31,20 @@ def read_dir(d: Path, *, remove_numbers: bool = False) -> dict[str, Path]:
     Return a dict mapping the scrubbed URLs they contain to the files within
     Fails if two files contain the same URLs after scrubbing
     """
-    files: list[Path] = lsf(d)
+    records: dict[Path, Record] = library(d)
+    keys: list[str] = [i.key for i in records.values()]
+    if remove_numbers:
+        keys = scrub_many((i.url for i in records.values()), remove_numbers=True)
     scrub_to_file: dict[str, list[Path]] = collections.defaultdict(list)
-    for f in files:
-        scb: str = scrub(extract_url(f), remove_numbers=remove_numbers)
+    for f, scb in zip(records, keys):
         scrub_to_file[scb].append(f)
+    return _unique(d, scrub_to_file)
+
+
+def _unique(d: Path, scrub_to_file: dict[str, list[Path]]) -> dict[str, Path]:
+    """
+    Map each scrubbed URL of d to its file, ignoring and warning about those shared by several files
+    """
     duplicates: list[tuple[str, list[Path]]] = [(i, k) for i, k in scrub_to_file.items() if len(k) != 1]
     if len(duplicates) > 0:
         disp_warning(f"Warning: duplicated files in: {d}")
@@ -48,50 +60,102 @@ def read_dir(d: Path, *, remove_numbers: bool = False) -> dict[str, Path]:
 ######################################################################
 
 
-def remove_unwanted_periods(x: str) -> str:
+_number = re.compile(r"[\d. ]*\d[\d. ]*")
+# Where a scrubbed URL may hold a number float() parses with letters: an exponent, nan, or inf
+_lettered = re.compile(r"\d\.?e\d|nan|inf")
+
+
+def template(x: str) -> str:
     """
-    Remove periods that are not part of a number
-    Numbers are assumed to start and end with a digit, not a decimal point
+    Mask the numbers in the scrubbed URL x, so that different chapters of a series share a template
+    Each run of digits, periods, and spaces is masked whole, as float() accepts numbers padded with spaces
     """
-    for offset, pat in enumerate((r"\.[^\d]", r"[^\d]\.")):
-        res: re.Match | None = re.compile(pat).search(x)
-        if res is not None:
-            idx: int = offset + x.find(res.group())
-            x = x[:idx] + x[idx + 1 :]
-            return remove_unwanted_periods(x)
-    while len(x) and x[0] == ".":
-        x = x[1:]
-    while len(x) and x[-1] == ".":
-        x = x[:-1]
-    return x
-
-
-def scrub(x: str, *, remove_numbers: bool = False) -> str:
+    return _number.sub("#", x)
+
+
+class Candidates:
     """
-    Scrub a URL clean of 'mucky' information that makes it hard to compare with others
-    For example: remove 'www.' since not all URLs need this
+    An index of scrubbed URLs which finds the few that are_same might accept for a given URL
+    These are those that share its template, that it contains, or that it contains after removing a number
+    Contained keys are indexed by their rarest interior word, which a URL containing them must contain whole;
+    keys of under three words have no interior word and are all checked
+    Templates and removals only cover numbers of digits, periods, and spaces; numbers float() parses with letters,
+    such as '1e5' or 'nan', are covered by always considering keys which may hold one,
+    and by considering every key for a URL which may hold one
+    """
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self._order: dict[str, int] = {k: i for i, k in enumerate(keys)}
+        self._templates: dict[str, list[str]] = collections.defaultdict(list)
+        for i in self._order:
+            self._templates[template(i)].append(i)
+        words: list[list[str]] = [i.split(" ") for i in self._order]
+        counts: collections.Counter[str] = collections.Counter(k for i in words for k in set(i[1:-1]))
+        self._words: dict[str, list[str]] = collections.defaultdict(list)
+        self._short: list[str] = []
+        self._lettered: list[str] = [i for i in self._order if _lettered.search(i)]
+        for i, k in zip(self._order, words):
+            if len(k) < 3:
+                self._short.append(i)
+            else:
+                self._words[min(k[1:-1], key=counts.__getitem__)].append(i)
+
+    def _contained(self, x: str) -> Iterator[str]:
+        """
+        Yield each key x contains
+        """
+        for i in set(x.split(" ")):
+            yield from (k for k in self._words.get(i, ()) if k in x)
+        yield from (k for k in self._short if k in x)
+
+    def _removed(self, x: str) -> Iterator[str]:
+        """
+        Yield each key that is x with part of a run of digits, periods, and spaces removed
+        Any number float() parses from x lies within such a run, so only these can differ from x by a chapter alone
+        """
+        for m in _number.finditer(x):
+            for i in range(m.start(), m.end()):
+                for k in range(i + 1, m.end() + 1):
+                    if (j := x[:i] + x[k:]) in self._order:
+                        yield j
+
+    def __call__(self, x: str) -> list[str]:
+        """
+        Return the candidates for x in the order their keys were given
+        """
+        if _lettered.search(x):
+            return list(self._order)
+        found: set[str] = set(self._templates.get(template(x), ()))
+        found.update(self._lettered)
+        found.update(self._contained(x))
+        found.update(self._removed(x))
+        return sorted(found, key=self._order.__getitem__)
+
+
+class Lookup:
+    """
+    Finds the files of a directory which guess should consider for a scrubbed URL, keyed by their scrubbed URLs
+    They are asked of the library daemon while it is running, otherwise the directory is read and indexed once
     """
-    # Trim
-    x = x.split("?", 1)[0].split("#", 1)[0]
-
-    # Remove unimportant words
-    x = x.lower()
-    x = re.sub(r"http://ww\d*\.", "", x)
-    x = re.sub(r"https://ww\d*\.", "", x)
-    x = re.sub(r"http://www\d*\.", "", x)
-    x = re.sub(r"https://www\d*\.", "", x)
-    x = x.replace("https", "").replace("http", "").replace("www", "")
-
-    # If remove numbers
-    if remove_numbers:
-        x = re.sub(r"\d", "", x)
 
-    # Clean
-    x = re.sub(r"[^a-z\. \d]", " ", x)
-    x = remove_unwanted_periods(x)
-    while "  " in x:
-        x = x.replace("  ", " ")
-    return x.strip()
+    def __init__(self, d: Path) -> None:
+        self._d: Path = d
+        self._local: tuple[dict[str, Path], Candidates] | None = None
+
+    def __call__(self, x: str) -> dict[str, Path]:
+        """
+        Return the files which are candidates for x, in the order Candidates would give them
+        """
+        if self._local is None and (found := candidates(self._d, x)) is not None:
+            scrub_to_file: dict[str, list[Path]] = collections.defaultdict(list)
+            for f, rec in found.items():
+                scrub_to_file[rec.key].append(f)
+            return _unique(self._d, scrub_to_file)
+        if self._local is None:
+            data: dict[str, Path] = read_dir(self._d)
+            self._local = (data, Candidates(data))
+        data, index = self._local
+        return {i: data[i] for i in index(x)}
 
 
 def diff_helper(a: str, b: str) -> tuple[str, str]:
@@ -177,15 +241,17 @@ def disp_warning(x: str) -> None:
 
 
 # pylint: disable=too-many-locals
-def guess_single(raw: Path, data: dict[str, Path], yes: bool, force: bool, dryrun: bool) -> bool:
+def guess_single(raw: Path, lookup: Lookup, yes: bool, force: bool, dryrun: bool) -> bool:
     """
     Try to replace the file in old for the same manga with raw, editing the title as needed
+    lookup finds the files of the directory being guessed against
     Return true on success
     """
     # Link match
     raw_data: str = extract_url(raw)
     scrubbed_data: str = scrub(raw_data)
-    options: list[str] = [i for i in data.keys() if are_same(scrubbed_data, i)]
+    data: dict[str, Path] = lookup(scrubbed_data)
+    options: list[str] = [i for i in data if are_same(scrubbed_data, i)]
     assert len(options) > 0, "Link matching failed"
     if len(options) > 1 and yes:
         raise RuntimeError("User input requires but --yes given, failing")
@@ -269,11 +335,12 @@ def guess(directory: Path, files: list[Path], yes: bool, force: bool, dryrun: bo
     if not dryrun:
         TRASH.mkdir(exist_ok=True)
     # For each file, try to guess
-    data: dict[str, Path] = read_dir(directory)
+    lookup = Lookup(directory)
     fails: list[Path] = []
     for f in files:
         try:
-            assert guess_single(f, data, yes, force, dryrun), f"Failed to guess {f} for directory {directory}"
+            ok: bool = guess_single(f, lookup, yes, force, dryrun)
+            assert ok, f"Failed to guess {f} for directory {directory}"
             print(f"\n{'-'*70}\n")
         except AssertionError as e:
             print(f"Failed for: {f}\n\t- {e}\n")
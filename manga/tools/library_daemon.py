@@ -0,0 +1,168 @@
+from typing import TYPE_CHECKING
+from pathlib import Path
+import socketserver
+import threading
+import argparse
+import socket
+import json
+import os
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+from manga.utils import INDEX_NAME, SOCKET, Record, scan
+
+from .guess import Candidates
+
+if TYPE_CHECKING:
+    from watchdog.events import FileSystemEvent
+    from typing import Any
+
+
+class _Watcher(FileSystemEventHandler):
+    """
+    Marks a library as stale whenever a file within it changes
+    """
+
+    def __init__(self, daemon: LibraryDaemon, root: str) -> None:
+        super().__init__()
+        self._daemon = daemon
+        self._root: str = root
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if not os.path.basename(os.fsdecode(event.src_path)).startswith(INDEX_NAME):
+            self._daemon.stale(self._root)
+
+
+class LibraryDaemon:
+    """
+    Keeps the records of each library requested in memory, watching them for changes
+    A library is rescanned on the first request after a change to it
+    The guess candidates index of a library is built when first needed after each scan
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stale_lock = threading.Lock()
+        self._observer = Observer()
+        self._libraries: dict[str, dict[Path, Record | None]] = {}
+        # The guess candidates index of each library, with the records it was built from
+        self._candidates: dict[str, tuple[dict[Path, Record | None], Candidates]] = {}
+        self._stale: set[str] = set()
+
+    def __enter__(self) -> LibraryDaemon:
+        self._observer.start()
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self._observer.stop()
+        self._observer.join()
+
+    def stale(self, root: str) -> None:
+        with self._stale_lock:
+            self._stale.add(root)
+
+    def library(self, d: str) -> dict[Path, Record | None]:
+        """
+        Return the records of library d, watching it if it is new
+        """
+        assert Path(d).is_dir(), f"{d} is not a directory"
+        with self._lock:
+            if d not in self._libraries:
+                self._observer.schedule(_Watcher(self, d), d, recursive=True)
+                self.stale(d)
+            with self._stale_lock:
+                rescan: bool = d in self._stale
+                self._stale.discard(d)  # Changes made while scanning will trigger another scan
+            if rescan:
+                self._libraries[d] = scan(Path(d))
+                self._candidates.pop(d, None)
+            return self._libraries[d]
+
+    def candidates(self, d: str, key: str) -> dict[Path, Record]:
+        """
+        Map each file of library d whose key is a guess candidate for the scrubbed URL key to its Record
+        Files are ordered as their candidates are
+        """
+        records = self.library(d)
+        with self._lock:
+            # A rescan after records were fetched replaces them, so an index of other records is rebuilt
+            if (cached := self._candidates.get(d)) is None or cached[0] is not records:
+                cached = self._candidates[d] = (records, Candidates(k.key for k in records.values() if k is not None))
+        index: Candidates = cached[1]
+        found: dict[str, int] = {k: i for i, k in enumerate(index(key))}
+        hits = ((i, k) for i, k in records.items() if k is not None and k.key in found)
+        return dict(sorted(hits, key=lambda i: found[i[1].key]))
+
+    def handle(self, request: dict[str, str]) -> dict[Path, Record | None]:
+        """
+        Answer a request from manga.utils.library:
+        library: every record of dir
+        find: the records of dir whose field, such as key (a scrubbed URL) or domain, equals value
+        candidates: the records of dir whose keys guess would consider for key
+        """
+        d: str = str(Path(request["dir"]).resolve())
+        match request["op"]:
+            case "library":
+                return self.library(d)
+            case "find":
+                field, value = request["field"], request["value"]
+                assert field in Record._fields, f"Unknown field: {field}"
+                return {i: k for i, k in self.library(d).items() if k is not None and getattr(k, field) == value}
+            case "candidates":
+                return dict(self.candidates(d, request["key"]))
+        raise ValueError(f"Unknown op: {request['op']}")
+
+
+def _serialize(records: dict[Path, Record | None]) -> dict[str, Any]:
+    return {str(i): None if k is None else k.row() for i, k in records.items()}
+
+
+def _server(daemon: LibraryDaemon) -> socketserver.ThreadingUnixStreamServer:
+    """
+    Construct a server answering requests on SOCKET with daemon
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            reply: dict[str, Any]
+            try:
+                reply = {"result": _serialize(daemon.handle(json.loads(self.rfile.readline())))}
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                reply = {"error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply, separators=(",", ":")).encode())
+
+    SOCKET.parent.mkdir(parents=True, exist_ok=True)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        running: bool = sock.connect_ex(str(SOCKET)) == 0
+    assert not running, f"A library daemon is already serving on {SOCKET}"
+    SOCKET.unlink(missing_ok=True)
+    old_umask: int = os.umask(0o077)
+    try:
+        return socketserver.ThreadingUnixStreamServer(str(SOCKET), Handler)
+    finally:
+        os.umask(old_umask)
+
+
+def library_daemon(dirs: list[Path]) -> None:
+    """
+    Serve the records of libraries to the other tools until interrupted
+    dirs are scanned up front, other libraries are loaded the first time they are requested
+    """
+    with LibraryDaemon() as daemon, _server(daemon) as server:
+        try:
+            for i in dirs:
+                print(f"Loaded {len(daemon.library(str(i.resolve())))} files from {i}")
+            print(f"Serving on {SOCKET}")
+            server.serve_forever()
+        finally:
+            SOCKET.unlink(missing_ok=True)
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dirs", type=Path, nargs="*", help="Libraries to load before serving")
+    try:
+        library_daemon(**vars(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
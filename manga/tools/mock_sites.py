@@ -0,0 +1,358 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dataclasses import dataclass, asdict, fields, field
+from typing import TYPE_CHECKING, NamedTuple
+from collections import Counter
+from urllib.parse import urlsplit
+from pathlib import Path
+import threading
+import argparse
+import random
+import json
+import time
+import gzip
+import zlib
+import sys
+
+from manga.sites.domains import Rule, domains
+from manga.sites import get_domain
+from manga.utils import split_on_num
+
+if TYPE_CHECKING:
+    from urllib.parse import SplitResult
+    from typing import Any
+
+
+@dataclass(frozen=True)
+class Faults:
+    """
+    The faults injected into responses; probabilities are per request
+    Every response is delayed by latency seconds, plus up to jitter more
+    A throttle starts a burst: the domain's next burst requests get a 429 or 503 with a Retry-After of retry_after
+    A timeout stalls the response for stall seconds, by when the client should have given up
+    A redirect sends the client to the same page at a different URL with a 301
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    throttle: float = 0.0
+    burst: int = 3
+    retry_after: float = 1.0
+    timeout: float = 0.0
+    stall: float = 30.0
+    redirect: float = 0.0
+
+
+class Response(NamedTuple):
+    status: int
+    body: bytes
+    headers: dict[str, str]
+    delay: float = 0.0
+
+
+@dataclass
+class DomainStats:
+    """
+    What a single domain was asked for and how it answered
+    Times are seconds since the server started
+    """
+
+    requests: int = 0
+    heads: int = 0
+    bytes: int = 0
+    active: int = 0
+    peak: int = 0
+    first: float | None = None
+    last: float | None = None
+    statuses: Counter[int] = field(default_factory=Counter)
+
+
+def _page(rule: Rule, found: bool, size: int) -> bytes:
+    """
+    A page of about size bytes which rule judges to be found or not
+    """
+    markers: tuple[str, ...] = rule.has if found else rule.lacks
+    filler: bytes = b'<div class="reader"><p>Lorem ipsum dolor sit amet</p></div>\n'
+    body: bytes = filler * max(1, size // len(filler))
+    middle: int = len(body) // 2
+    body = body[:middle] + " ".join(markers).encode() + body[middle:]
+    return b"<!DOCTYPE html><html><body>" + body + b"</body></html>"
+
+
+def _compress(body: bytes, coding: str) -> bytes:
+    """
+    Compress body with the given content coding
+    """
+    match coding:
+        case "identity":
+            return body
+        case "gzip":
+            return gzip.compress(body, mtime=0)
+        case "deflate":
+            return zlib.compress(body)
+        case "br":
+            import brotli  # pylint: disable=import-outside-toplevel
+
+            return brotli.compress(body)
+        case "zstd":
+            from compression import zstd  # pylint: disable=import-outside-toplevel
+
+            return zstd.compress(body)
+    raise ValueError(f"Unknown content coding: {coding}")
+
+
+def _accepted(header: str) -> set[str]:
+    """
+    The content codings an Accept-Encoding header allows
+    """
+    ret: set[str] = {"identity"}
+    for i in header.split(","):
+        coding, _, q = i.partition(";")
+        try:
+            allowed: bool = float(q.partition("=")[2] or 1) > 0
+        except ValueError:
+            continue
+        if allowed:
+            ret.add(coding.strip().lower())
+        else:
+            ret.discard(coding.strip().lower())
+    return ret
+
+
+class MockSites(ThreadingHTTPServer):
+    """
+    A server answering as every supported site, selected by the Host header of each request
+    A series' chapters exist up to latest plus, if spread, a stable per series offset of at most spread
+    Faults are decided by a random generator seeded by seed, the page, and how often the page was requested
+    Each site compresses pages with the first of a stable suffix of encodings which the client accepts
+    A stable fraction bad_heads of sites answer every HEAD with 200, as if every page existed
+    """
+
+    daemon_threads = True
+    request_queue_size = 1024  # Accept as many concurrent connections as the async engine opens
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        address: tuple[str, int],
+        faults: Faults,
+        latest: int,
+        spread: int,
+        size: int,
+        seed: int,
+        encodings: tuple[str, ...] = ("gzip",),
+        bad_heads: float = 0.0,
+    ):
+        assert encodings, "Sites must support at least one content coding"
+        super().__init__(address, _Handler)
+        self.faults: Faults = faults
+        self.encodings: tuple[str, ...] = encodings
+        self.bad_heads: float = bad_heads
+        self._latest: int = latest
+        self._spread: int = spread
+        self._seed: int = seed
+        pages = {(d, f): _page(r, f, size) for d, r in domains.items() for f in (True, False)}
+        self._pages: dict[tuple[str, bool, str], bytes] = {
+            (*i, c): _compress(k, c) for i, k in pages.items() for c in {"identity", *encodings}
+        }
+        self._lock = threading.Lock()
+        self._start: float = time.monotonic()
+        self._attempts: Counter[str] = Counter()
+        self._bursts: Counter[str] = Counter()
+        self._stats: dict[str, DomainStats] = {}
+
+    def _exists(self, series: str, chapter: float) -> bool:
+        return chapter <= self._latest + (zlib.crc32(series.encode()) % (self._spread + 1) if self._spread else 0)
+
+    def _codings(self, domain: str) -> tuple[str, ...]:
+        return self.encodings[zlib.crc32(domain.encode()) % len(self.encodings) :]
+
+    def _bad_head(self, domain: str) -> bool:
+        return zlib.crc32(f"head {domain}".encode()) < self.bad_heads * (1 << 32)
+
+    def _fault(self, domain: str, url: str) -> tuple[Response | None, float]:
+        """
+        Return the faulty response to give to url, if any, and how long to stall the response for
+        """
+        with self._lock:
+            rng = random.Random(f"{self._seed} {url} {self._attempts[url]}")
+            self._attempts[url] += 1
+            if self._bursts[domain] == 0 and rng.random() < self.faults.throttle:
+                self._bursts[domain] = self.faults.burst
+            throttled: bool = self._bursts[domain] > 0
+            if throttled:
+                self._bursts[domain] -= 1
+        if throttled:
+            retry_after: dict[str, str] = {"Retry-After": f"{self.faults.retry_after:g}"}
+            return Response(rng.choice((429, 503)), b"Slow down", retry_after), 0.0
+        stall: float = self.faults.stall if rng.random() < self.faults.timeout else 0.0
+        parts = urlsplit(url)
+        if "moved=1" not in parts.query and rng.random() < self.faults.redirect:
+            location: str = f"{parts.path}?{parts.query + '&' if parts.query else ''}moved=1"
+            return Response(301, b"", {"Location": location}), stall
+        return None, stall
+
+    # pylint: disable=too-many-arguments
+    def respond(self, domain: str, host: str, parts: SplitResult, accept: str = "", head: bool = False) -> Response:
+        """
+        The response of the site host, of domain, to a GET (or if head, a HEAD) of parts
+        The client sent accept as its Accept-Encoding
+        """
+        if (rule := domains.get(domain)) is None:
+            if parts.path == "/_stats":
+                return Response(200, json.dumps(self.report()).encode(), {"Content-Type": "application/json"})
+            return Response(404, f"Unknown site: {host}".encode(), {})
+        fault, stall = self._fault(domain, f"{host}{parts.path}?{parts.query}")
+        delay: float = self.faults.latency + random.uniform(0, self.faults.jitter) + stall
+        if fault is not None:
+            return fault._replace(delay=delay)
+        try:
+            series, chapter, _ = split_on_num(parts.path)
+        except ValueError:
+            return Response(404, b"Not found", {}, delay)
+        found: bool = self._exists(f"{domain}{series}", chapter) or (head and self._bad_head(domain))
+        if rule.by_status and not found:
+            return Response(404, b"Not found", {}, delay)
+        accepted: set[str] = _accepted(accept)
+        coding: str = next((i for i in self._codings(domain) if i in accepted), "identity")
+        headers: dict[str, str] = {"Content-Type": "text/html", "Vary": "Accept-Encoding"}
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return Response(200, self._pages[(domain, found, coding)], headers, delay)
+
+    def begin(self, domain: str, head: bool) -> None:
+        if domain not in domains:
+            return
+        now: float = time.monotonic() - self._start
+        with self._lock:
+            stats = self._stats.setdefault(domain, DomainStats())
+            stats.requests += 1
+            stats.heads += head
+            stats.active += 1
+            stats.peak = max(stats.peak, stats.active)
+            stats.first = now if stats.first is None else stats.first
+            stats.last = now
+
+    def end(self, domain: str, response: Response) -> None:
+        if domain not in domains:
+            return
+        with self._lock:
+            stats = self._stats[domain]
+            stats.active -= 1
+            stats.bytes += len(response.body)
+            stats.statuses[response.status] += 1
+
+    def report(self) -> dict[str, Any]:
+        """
+        The statistics of each domain as JSON
+        """
+        with self._lock:
+            return {i: {**asdict(k), "statuses": dict(k.statuses)} for i, k in sorted(self._stats.items())}
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        if not isinstance(sys.exception(), ConnectionError):  # Clients close streams once they have a verdict
+            super().handle_error(request, client_address)
+
+    def summary(self) -> str:
+        """
+        A table of what each domain was asked for
+        """
+        lines: list[str] = [f"{'Domain':<20} {'Requests':>8} {'Peak':>5} {'Seconds':>8}  Statuses"]
+        for domain, stats in self.report().items():
+            span: float = stats["last"] - stats["first"]
+            statuses: str = ", ".join(f"{i}: {k}" for i, k in sorted(stats["statuses"].items()))
+            lines.append(f"{domain:<20} {stats['requests']:>8} {stats['peak']:>5} {span:>8.2f}  {statuses}")
+        return "\n".join(lines)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, as real sites allow
+    server: MockSites
+
+    def _reply(self, head: bool) -> None:
+        host: str = self.headers.get("Host", "")
+        domain: str = get_domain(f"http://{host}")
+        self.server.begin(domain, head)
+        accept: str = self.headers.get("Accept-Encoding", "")
+        response = self.server.respond(domain, host, urlsplit(self.path), accept, head)
+        try:
+            time.sleep(response.delay)
+            self.send_response(response.status)
+            for i, k in response.headers.items():
+                self.send_header(i, k)
+            self.send_header("Content-Length", str(len(response.body)))
+            self.end_headers()
+            if not head:
+                self.wfile.write(response.body)
+        finally:
+            self.server.end(domain, response._replace(body=b"") if head else response)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name
+        self._reply(head=False)
+
+    def do_HEAD(self) -> None:  # pylint: disable=invalid-name
+        self._reply(head=True)
+
+    def log_message(self, *_: Any) -> None:
+        pass
+
+
+# pylint: disable=too-many-arguments
+def mock_sites(
+    host: str,
+    port: int,
+    faults: Faults,
+    latest: int,
+    spread: int,
+    size: int,
+    seed: int,
+    encodings: tuple[str, ...],
+    bad_heads: float,
+    stats: Path | None,
+) -> None:
+    """
+    Serve every supported site on host:port until interrupted, then print what each domain was asked for
+    If stats, the statistics of each domain are also saved there as JSON; they are served at /_stats as well
+    """
+    with MockSites((host, port), faults, latest, spread, size, seed, encodings, bad_heads) as server:
+        print(f"Serving {len(domains)} sites on http://{host}:{server.server_port}")
+        print(f"Point the tools at it with --host-override {host}:{server.server_port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        print(server.summary())
+        if stats is not None:
+            stats.write_text(json.dumps(server.report(), indent=1))
+
+
+def cli() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1", help="The address to serve on")
+    parser.add_argument("-p", "--port", type=int, default=8000, help="The port to serve on; 0 picks a free port")
+    parser.add_argument("--latest", type=int, default=100, help="The latest chapter of each series")
+    parser.add_argument("--spread", type=int, default=0, help="Vary the latest chapter of each series by up to this")
+    parser.add_argument("--size", type=int, default=64 << 10, help="The size of each page in bytes")
+    parser.add_argument("--seed", type=int, default=0, help="The seed faults are chosen by")
+    parser.add_argument(
+        "--encodings",
+        type=lambda x: tuple(x.split(",")),
+        default=("gzip",),
+        help="Comma separated content codings pages may be compressed with, preferred first; "
+        "each site supports a stable suffix of them, identity means uncompressed",
+    )
+    parser.add_argument(
+        "--bad-heads", type=float, default=0.0, help="The fraction of sites which answer every HEAD with 200"
+    )
+    parser.add_argument("--stats", type=Path, help="Save the statistics of each domain to this JSON file on exit")
+    faults = parser.add_argument_group("Faults")
+    faults.add_argument("--latency", type=float, default=0.0, help="Seconds to delay each response by")
+    faults.add_argument("--jitter", type=float, default=0.0, help="Up to this many more seconds of random delay")
+    faults.add_argument("--throttle", type=float, default=0.0, help="The chance a request starts a burst of 429/503s")
+    faults.add_argument("--burst", type=int, default=3, help="The number of 429/503s in each burst")
+    faults.add_argument("--retry-after", type=float, default=1.0, help="The Retry-After of each 429/503")
+    faults.add_argument("--timeout", type=float, default=0.0, help="The chance a response stalls")
+    faults.add_argument("--stall", type=float, default=30.0, help="The seconds a stalled response takes")
+    faults.add_argument("--redirect", type=float, default=0.0, help="The chance a request is redirected")
+    ns = vars(parser.parse_args())
+    fault_args: dict[str, Any] = {i.name: ns.pop(i.name) for i in fields(Faults)}
+    mock_sites(faults=Faults(**fault_args), **ns)
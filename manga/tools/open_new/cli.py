@@ -11,5 +11,36 @@ def cli() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("--skip", type=str, nargs="+", default=[], help="Domains to skip")
     parser.add_argument("-d", "--delay", type=float, default=0.4, help="A rate limit to prevent DOS'ing sites")
+    parser.add_argument(
+        "--engine",
+        choices=("threads", "async"),
+        default="threads",
+        help="Make requests from a thread pool or from a single asyncio event loop",
+    )
+    parser.add_argument(
+        "--per-domain", type=int, default=8, help="With --engine async, the max concurrent requests per domain"
+    )
+    parser.add_argument("--rate", type=float, default=8.0, help="The max requests per second to each domain")
+    parser.add_argument("--burst", type=int, default=8, help="The max requests to a domain that may be made at once")
+    parser.add_argument("--pool-size", type=int, default=32, help="The number of connections kept alive per host")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not use nor update the cache of previously seen pages"
+    )
+    parser.add_argument(
+        "--host-override", metavar="HOST:PORT", help="Send every request to this host instead, such as mock-sites"
+    )
+    parser.add_argument("--report", type=Path, help="Where to save the JSON report of every request made")
+    parser.add_argument("--prometheus", type=Path, help="Also save the report here as a Prometheus textfile")
+    parser.add_argument(
+        "--resume", action="store_true", help="Reuse the results of an interrupted run on this directory"
+    )
+    parser.add_argument(
+        "--no-warm-up", action="store_true", help="Do not resolve and connect to every host before testing"
+    )
+    parser.add_argument(
+        "--no-head",
+        action="store_true",
+        help="Never send HEAD requests in place of GETs, nor check whether they may be",
+    )
     parser.add_argument("directory", type=Path, help="The directory to open new items from")
     sys.exit(0 if open_new(**vars(parser.parse_args())) else -1)
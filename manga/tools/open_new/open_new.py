@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from typing import TYPE_CHECKING
 from signal import Signals
 from pathlib import Path
@@ -6,30 +7,37 @@ import os
 import requests
 import tqdm
 
-from manga.utils import redirect_print_to_tqdm, extract_url, lsf
+from manga.utils import redirect_print_to_tqdm, library, Journal
 from manga import sites
 
-from .thread_handler import ThreadHandler
+from .thread_handler import ThreadHandler, AsyncHandler
 from .results import handle_results
 from .tested import Tested
 
 if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from collections.abc import Callable, Iterator
     from typing import Any
 
 
 mk_open_remaining_first: bool = True
 
 
-def evaluate(url: str, tested: Tested, pbar: tqdm.std.tqdm) -> None:
+_test_kwargs: dict[str, Any] = {"timeout_retries": 3, "base_delay": 30}
+
+
+def _store(url: str, tested: Tested, journal: Journal, pbar: tqdm.std.tqdm, get: Callable[[], bool]) -> None:
     """
-    Determine if url has a new chapter or not
-    Store the result in tested and update pbar
+    Store the result of get(), whether url has a new chapter or not, in tested and journal and update pbar
+    Failures are not journaled, so that resuming retries them
     """
     try:
-        status: bool = sites.test(url, timeout_retries=3, base_delay=30)
+        status: bool = get()
         (tested.has_new if status else tested.ignore).add(url)
+        journal.record(url, "has_new" if status else "ignore")
     except sites.UnknownDomain:
         tested.unknown.add(url)
+        journal.record(url, "unknown")
     except requests.exceptions.RequestException:
         tested.failed.add(url)
     except Exception as e:
@@ -38,34 +46,112 @@ def evaluate(url: str, tested: Tested, pbar: tqdm.std.tqdm) -> None:
         pbar.update()
 
 
-def open_new(directory: Path, skip: set[str] | list[str], delay: float) -> bool:
+def evaluate(url: str, tested: Tested, journal: Journal, pbar: tqdm.std.tqdm) -> None:
+    """
+    Determine if url has a new chapter or not
+    Store the result in tested and journal and update pbar
+    """
+    _store(url, tested, journal, pbar, lambda: sites.test(url, **_test_kwargs))
+
+
+def evaluate_async(url: str, tested: Tested, journal: Journal, pbar: tqdm.std.tqdm) -> Callable[[Future[bool]], None]:
+    """
+    Return a callback which stores the result of an Engine testing url in tested and journal and updates pbar
+    AsyncHandler calls it off the event loop, so neither the journal nor pbar hold it up
+    """
+    return lambda future: _store(url, tested, journal, pbar, future.result)
+
+
+@contextmanager
+def _executor(engine: str, per_domain: int, handlers: dict[Signals, Any]) -> Iterator[ThreadHandler | AsyncHandler]:
+    """
+    Yield the executor to test URLs with, as selected by engine
+    """
+    if engine == "async":
+        with sites.Engine(per_domain=per_domain) as eng, AsyncHandler(handlers, eng) as ret:
+            yield ret
+    else:
+        with ThreadHandler(max_workers=32, handlers=handlers) as ret:
+            yield ret
+
+
+def open_new(
+    directory: Path,
+    skip: set[str] | list[str],
+    delay: float,
+    engine: str = "threads",
+    per_domain: int = 8,
+    pool_size: int = 32,
+    no_cache: bool = False,
+    rate: float = 8.0,
+    burst: int = 8,
+    host_override: str | None = None,
+    report: Path | None = None,
+    prometheus: Path | None = None,
+    resume: bool = False,
+    no_warm_up: bool = False,
+    no_head: bool = False,
+) -> bool:
     """
     Open each file in directory that has a new chapter ready
+    engine selects whether requests are made from a thread pool or from a shared asyncio event loop
+    pool_size is the number of connections kept alive per host
+    If no_cache, pages are not revalidated against nor stored in the HTTP cache
+    Requests to each domain are limited to rate per second, with bursts of up to burst requests
+    If host_override, every request is sent to that host instead, e.g. to manga.tools.mock_sites;
+    the HTTP cache and HEAD support it learns are kept apart, see HostOverride.scratch
+    Metrics of every request are saved as JSON to report (by default a new file in sites.metrics.directory)
+    and, if prometheus, as a Prometheus textfile to prometheus
+    Results are journaled as they arrive; if resume, those journaled by an interrupted run are reused
+    Manga opened are journaled too, so resuming after an interrupt does not open them again
+    Unless no_warm_up, every host is resolved and connected to before the sweep starts
+    Either way, DNS answers are memoized until the sweep ends, see sites.Resolver
+    Unless no_head, status-only domains whose HEAD responses agree with their GETs are sent HEADs instead
     """
-    if isinstance(skip, list):
-        return open_new(directory, set(skip), delay)
+    skip = set(skip)
     print("Checking arguments...")
     directory = directory.resolve()
     assert directory.exists(), f"{directory} does not exist"
     assert directory.is_dir(), f"{directory} is not a directory"
     # Determine which requests must be made
     print("Scanning files...")
-    urls: set[str] = {extract_url(i) for i in lsf(directory)}
+    urls: set[str] = {i.url for i in library(directory).values()}
     results = Tested()
+    journal = Journal("open-new", directory)
+    for url, outcome in journal.open(resume).items():
+        if url in urls:
+            getattr(results, outcome).add(url)
+    if resume:
+        print(f"Resuming with {len(results.tested)} results from {journal.path}")
+    sites.pool.resize(pool_size)
+    sites.cache.enabled = not no_cache
+    sites.heads.enabled = not no_head
+    sites.limiter.configure(rate, burst)
+    sites.override.configure(host_override)
+    for i in (sites.cache, sites.heads):
+        i.path = sites.override.scratch(i.path)
+
+    def save_report() -> None:
+        print(sites.metrics.summary())
+        print(f"Saved the run report to {sites.metrics.save(report, 'open-new')}")
+        if prometheus is not None:
+            sites.metrics.prometheus(prometheus)
 
     # Sigint handler
-    def sigint_handler(executor: ThreadHandler, *_: Any) -> None:
+    def sigint_handler(executor: ThreadHandler | AsyncHandler, *_: Any) -> None:
         global mk_open_remaining_first  # pylint: disable=global-statement
         if not mk_open_remaining_first:
             os._exit(1)  # pylint: disable=protected-access
         mk_open_remaining_first = False
         print("Terminating executor...")
         executor.kill()
-        handle_results(urls, results, delay)
+        save_report()
+        handle_results(urls, results, delay, journal)
+        journal.close(complete=False)
         os._exit(0)  # pylint: disable=protected-access
 
     # Siginfo handler
-    def siginfo_handler(executor: ThreadHandler, *_: Any) -> None:
+    def siginfo_handler(executor: ThreadHandler | AsyncHandler, *_: Any) -> None:
         untested: set[str] = urls - results.tested
         if not untested:
             return
@@ -74,18 +160,31 @@ def open_new(directory: Path, skip: set[str] | list[str], delay: float) -> bool:
             print(i)
 
     # Determine what to open
-    print(f"Making at most {len(urls)} requests...")
-    with tqdm.tqdm(total=len(urls), dynamic_ncols=True) as pbar:
+    untested: set[str] = urls - results.tested
+    print(f"Making at most {len(untested)} requests...")
+    sites.metrics.begin()
+    handlers = {Signals.SIGINT: sigint_handler, Signals.SIGINFO: siginfo_handler}
+    with sites.resolver, tqdm.tqdm(total=len(urls), initial=len(urls) - len(untested), dynamic_ncols=True) as pbar:
         with redirect_print_to_tqdm():
-            with ThreadHandler(
-                max_workers=32, handlers={Signals.SIGINT: sigint_handler, Signals.SIGINFO: siginfo_handler}
-            ) as executor:
-                for i in urls:
+            with _executor(engine, per_domain, handlers) as executor:
+                if not no_warm_up:
+                    eng: sites.Engine | None = executor.engine if isinstance(executor, AsyncHandler) else None
+                    sites.warm_up((i for i in untested if sites.get_domain(i) not in skip), eng)
+                for i in untested:
                     if sites.get_domain(i) in skip:
                         results.skip.add(i)
                         pbar.update()
+                    elif isinstance(executor, AsyncHandler):
+                        executor.add(evaluate_async(i, results, journal, pbar), i, **_test_kwargs)
                     else:
-                        executor.add(evaluate, i, results, pbar)
+                        executor.add(evaluate, i, results, journal, pbar)
     # Open links
-    handle_results(urls, results, delay)
+    complete: bool = results.tested >= urls
+    sites.cache.close()
+    sites.heads.save()
+    if engine != "async":
+        print(sites.pool.summary())
+    save_report()
+    handle_results(urls, results, delay, journal)
+    journal.close(complete=complete)
     return True
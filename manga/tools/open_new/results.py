@@ -1,4 +1,5 @@
 from dataclasses import astuple
+from typing import TYPE_CHECKING
 from time import sleep
 import subprocess
 
@@ -6,10 +7,14 @@ from tqdm import tqdm
 
 from .tested import Tested
 
+if TYPE_CHECKING:
+    from manga.utils import Journal
 
-def handle_results(urls: set[str], tested: Tested, delay: float) -> None:
+
+def handle_results(urls: set[str], tested: Tested, delay: float, journal: Journal) -> None:
     """
     Print out the test results and open each of the given URLs that should not be ignored
+    Each URL opened is journaled, so that resuming does not open it again
     """
     if len(tested.unknown) > 0:
         print("The following domains were not known:")
@@ -25,7 +30,11 @@ def handle_results(urls: set[str], tested: Tested, delay: float) -> None:
         print("The following domains were not tested:")
         print("\t" + "\n\t".join(sorted(urls - all_tested)))
         print("Assuming all remaining URLs must be opened...")
+    if len(tested.opened) > 0:
+        print(f"Not reopening {len(tested.opened)} manga opened before the run was interrupted")
     print("Opening manga...")
-    for url in tqdm(urls - tested.ignore - tested.skip, dynamic_ncols=True):
+    for url in tqdm(urls - tested.ignore - tested.skip - tested.opened, dynamic_ncols=True):
         subprocess.check_call(["open", url], stdout=subprocess.DEVNULL)
+        tested.opened.add(url)
+        journal.record(url, "opened")
         sleep(delay)  # Rate limit
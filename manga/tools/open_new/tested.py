@@ -13,6 +13,7 @@ class Tested:
     skip: set[str] = field(default_factory=set)
     failed: set[str] = field(default_factory=set)
     unknown: set[str] = field(default_factory=set)
+    opened: set[str] = field(default_factory=set)  # Opened by an interrupted run, so nothing is left to do
 
     @property
     def tested(self) -> set[str]:
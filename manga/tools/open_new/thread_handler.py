@@ -1,29 +1,46 @@
 from typing import TYPE_CHECKING, Protocol
 from concurrent.futures import thread
 import signal
+import queue
 
 if TYPE_CHECKING:
     from concurrent.futures import Future
+    from collections.abc import Callable
     from typing import Any
 
+    from manga.sites import Engine
+
 
 class _SignalHandler(Protocol):
-    def __call__(self, executor: ThreadHandler, *args: Any):
+    def __call__(self, executor: ThreadHandler | AsyncHandler, *args: Any):
         pass
 
 
+def _install_handlers(executor: ThreadHandler | AsyncHandler, handlers: dict[signal.Signals, _SignalHandler]):
+    """
+    Install handlers, bound to executor, and return the original handlers
+    """
+
+    def bind(f: _SignalHandler) -> Callable[..., Any]:
+        def ret(*x):
+            return f(executor, *x)
+
+        return ret
+
+    return {s: signal.signal(s, bind(f)) for s, f in handlers.items()}
+
+
+def _restore_handlers(orig: dict[signal.Signals, Any]) -> None:
+    for s, f in orig.items():
+        signal.signal(s, f)
+
+
 class ThreadHandler(thread.ThreadPoolExecutor):
     def __init__(self, handlers: dict[signal.Signals, _SignalHandler], *args: Any, **kwargs: Any):
         super().__init__(*args, **kwargs)
         self._handlers = dict(handlers)
         self.futures: list[Future] = []
 
-    def _install_handler(self, s: signal.Signals, f: _SignalHandler) -> Any:
-        def ret(*x):
-            return f(self, *x)
-
-        return signal.signal(s, ret)
-
     def add(self, fn, *args: Any, **kwargs: Any) -> None:
         self.futures.append(super().submit(fn, *args, **kwargs))
 
@@ -33,12 +50,46 @@ class ThreadHandler(thread.ThreadPoolExecutor):
             i.cancel()
 
     def __enter__(self) -> ThreadHandler:
-        self._orig: dict[signal.Signals, Any] = {s: self._install_handler(s, f) for s, f in self._handlers.items()}
+        self._orig: dict[signal.Signals, Any] = _install_handlers(self, self._handlers)
         rv = super().__enter__()
         assert rv is self
         return self
 
     def __exit__(self, *args):
         super().__exit__(*args)
-        for s, f in self._orig.items():
-            signal.signal(s, f)
+        _restore_handlers(self._orig)
+
+
+class AsyncHandler:
+    """
+    A ThreadHandler that runs sites tests on an Engine's event loop rather than on a thread each
+    Callbacks are not run on the event loop but by the thread that exits this, as each test completes
+    """
+
+    def __init__(self, handlers: dict[signal.Signals, _SignalHandler], engine: Engine):
+        self._handlers = dict(handlers)
+        self.engine: Engine = engine
+        self.futures: list[Future] = []
+        self._done: queue.SimpleQueue[tuple[Callable[[Future[bool]], None], Future[bool]]] = queue.SimpleQueue()
+
+    def add(self, done: Callable[[Future[bool]], None], url: str, **kwargs: Any) -> None:
+        """
+        Test url on the engine, done is called with the resulting future
+        """
+        future = self.engine.submit(url, **kwargs)
+        future.add_done_callback(lambda f: self._done.put((done, f)))
+        self.futures.append(future)
+
+    def kill(self):
+        for i in self.futures:
+            i.cancel()
+
+    def __enter__(self) -> AsyncHandler:
+        self._orig: dict[signal.Signals, Any] = _install_handlers(self, self._handlers)
+        return self
+
+    def __exit__(self, *args):
+        for _ in self.futures:
+            done, future = self._done.get()
+            done(future)
+        _restore_handlers(self._orig)
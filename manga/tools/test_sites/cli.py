@@ -29,11 +29,49 @@ def cli() -> None:
     parser.add_argument("directory", type=Path, help="The directory to test")
     parser.add_argument("--opener", default="open", help="The default binary to open a URL with")
     parser.add_argument("--no-prompt", action="store_true", help="Auto open sites when complete, do not prompt user")
+    parser.add_argument("--rate", type=float, default=8.0, help="The max requests per second to each domain")
+    parser.add_argument("--burst", type=int, default=8, help="The max requests to a domain that may be made at once")
     parser.add_argument(
-        "--delay",
-        default=0,
-        type=int,
-        help="The number of seconds each thread should wait between testing sites (to avoid DOSing)",
+        "--engine",
+        choices=("threads", "async"),
+        default="threads",
+        help="Make requests from the worker threads or from a single asyncio event loop",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=32, help="The number of worker threads testing URLs with the threads engine"
+    )
+    parser.add_argument("--per-domain", type=int, default=8, help="The max URLs per domain tested concurrently")
+    parser.add_argument(
+        "--speculative", action="store_true", help="Make the independent probes of each test concurrently"
+    )
+    parser.add_argument(
+        "--full-plan", action="store_true", help="Do not prune probes a domain's history suggests are unneeded"
+    )
+    parser.add_argument("--pool-size", type=int, default=32, help="The number of connections kept alive per host")
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Do not use nor update the caches of seen pages and probe results"
+    )
+    parser.add_argument(
+        "--positive-ttl", type=float, default=30, help="The number of days to trust that a chapter exists"
+    )
+    parser.add_argument(
+        "--negative-ttl", type=float, default=1, help="The number of days to trust that a chapter does not exist"
+    )
+    parser.add_argument(
+        "--host-override", metavar="HOST:PORT", help="Send every request to this host instead, such as mock-sites"
+    )
+    parser.add_argument("--report", type=Path, help="Where to save the JSON report of every request made")
+    parser.add_argument("--prometheus", type=Path, help="Also save the report here as a Prometheus textfile")
+    parser.add_argument(
+        "--resume", action="store_true", help="Reuse the statuses found by an interrupted run on this directory"
+    )
+    parser.add_argument(
+        "--no-warm-up", action="store_true", help="Do not resolve and connect to every host before testing"
+    )
+    parser.add_argument(
+        "--no-head",
+        action="store_true",
+        help="Never send HEAD requests in place of GETs, nor check whether they may be",
     )
     skip = parser.add_argument_group("Skip Options")
     skip.add_argument("--skip", type=str, nargs="+", action="extend", default=[], help="Domains to skip")
@@ -1,13 +1,21 @@
 from typing import TYPE_CHECKING, Protocol
 from concurrent.futures import thread
+from collections import deque
+import traceback
+import threading
+import queue
 
 from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn, MofNCompleteColumn, TaskProgressColumn
 
+from .status import Untested
+
 if TYPE_CHECKING:
     from concurrent.futures import Future
-    from collections.abc import Callable
+    from collections.abc import Callable, Coroutine
     from typing import Any
 
+    from manga.sites import Engine
+
 if TYPE_CHECKING:
     from .state import URL, State
 
@@ -26,12 +34,108 @@ class _ThreadHandler(thread.ThreadPoolExecutor):
             i.cancel()
 
 
+class _Scheduler:
+    """
+    A thread-safe queue of URLs shared by every worker
+    At most per_domain URLs of each domain are handed out at once
+    The domain with the most URLs remaining is served first, so the longest queues start earliest
+    """
+
+    def __init__(self, buckets: dict[str, list[URL]], per_domain: int) -> None:
+        assert per_domain > 0, "per_domain must be positive"
+        self._per_domain: int = per_domain
+        self._queues: dict[str, deque[URL]] = {i: deque(k) for i, k in buckets.items()}
+        self._active: dict[str, int] = dict.fromkeys(buckets, 0)
+        self._cond = threading.Condition()
+
+    def take(self, block: bool = True) -> URL | None:
+        """
+        Block until a URL may be tested and return it; return None once no URLs remain
+        If not block, return None at once if no URL may be tested yet
+        """
+        with self._cond:
+            while True:
+                ready = [i for i, k in self._queues.items() if k and self._active[i] < self._per_domain]
+                if ready:
+                    domain: str = max(ready, key=lambda i: len(self._queues[i]))
+                    self._active[domain] += 1
+                    return self._queues[domain].popleft()
+                if not block or not any(self._queues.values()):
+                    return None
+                self._cond.wait()
+
+    def done(self, url: URL) -> None:
+        """
+        Signal that testing url has completed
+        """
+        with self._cond:
+            self._active[url.domain] -= 1
+            self._cond.notify_all()
+
+
 class FuncType(Protocol):
-    def __call__(self, urls: list[URL], update_pbar: Callable[[], None], *args: Any, **kwargs: Any) -> None: ...
+    def __call__(self, url: URL, *args: Any, **kwargs: Any) -> None | Coroutine[Any, Any, None]: ...
 
 
-def dispatch(state: State, func: FuncType, *args: Any, **kwargs: Any) -> None:
-    buckets = state.domains()
+def _work(scheduler: _Scheduler, finish: Callable[[URL], None], func: FuncType, *args: Any, **kwargs: Any):
+    """
+    Test URLs from scheduler until none remain
+    """
+    while (url := scheduler.take()) is not None:
+        try:
+            func(url, *args, **kwargs)
+        except Exception:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+        finally:
+            scheduler.done(url)
+            finish(url)
+
+
+def _schedule(
+    scheduler: _Scheduler, finish: Callable[[URL], None], engine: Engine, func: FuncType, *args: Any, **kwargs: Any
+):
+    """
+    Test URLs from scheduler on the event loop of engine until none remain
+    Each URL is finished on this thread once tested, so that the event loop never waits on disk or the terminal
+    """
+    done: queue.SimpleQueue[tuple[URL, Future[None]]] = queue.SimpleQueue()
+    running: int = 0
+    while True:
+        while (url := scheduler.take(block=False)) is not None:
+            engine.run(func(url, *args, **kwargs)).add_done_callback(lambda f, url=url: done.put((url, f)))
+            running += 1
+        if not running:  # Nothing is being tested, so nothing is held back by the limit per domain
+            return
+        url, future = done.get()
+        running -= 1
+        try:
+            future.result()
+        except Exception:  # pylint: disable=broad-exception-caught
+            traceback.print_exc()
+        finally:
+            scheduler.done(url)
+            finish(url)
+
+
+# pylint: disable=too-many-arguments
+def dispatch(
+    state: State,
+    func: FuncType,
+    *args: Any,
+    workers: int,
+    per_domain: int,
+    engine: Engine | None = None,
+    finish: Callable[[URL], None] | None = None,
+    **kwargs: Any,
+) -> None:
+    """
+    Call func on each untested URL in state from a pool of worker threads
+    If engine is given, func is instead a coroutine function whose calls are all run on the engine's event loop,
+    so no thread is held per URL being tested
+    At most per_domain URLs of a single domain are tested concurrently
+    Once each URL is tested, finish is called with it, from its worker or, with engine, from the calling thread
+    """
+    buckets = dict(sorted(state.domains(Untested).items(), key=lambda i: len(i[1]), reverse=True))
     with Progress(
         TextColumn("[progress.description]{task.description}"),
         TaskProgressColumn(),
@@ -41,7 +145,19 @@ def dispatch(state: State, func: FuncType, *args: Any, **kwargs: Any) -> None:
         transient=True,
         expand=True,
     ) as pbar:
-        with _ThreadHandler(max_workers=len(buckets)) as executor:  # No DOS-ing
-            for domain, urls in buckets.items():
-                task = pbar.add_task(f"{domain}:", total=len(urls))
-                executor.add(func, urls, lambda bound=task: pbar.update(bound, advance=1), *args, **kwargs)
+        total = pbar.add_task("All:", total=sum(map(len, buckets.values())))
+        tasks = {domain: pbar.add_task(f"{domain}:", total=len(urls)) for domain, urls in buckets.items()}
+
+        def done(url: URL) -> None:
+            if finish is not None:
+                finish(url)
+            pbar.update(tasks[url.domain], advance=1)
+            pbar.update(total, advance=1)
+
+        scheduler = _Scheduler(buckets, per_domain)
+        if engine is not None:
+            _schedule(scheduler, done, engine, func, *args, **kwargs)
+            return
+        with _ThreadHandler(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.add(_work, scheduler, done, func, *args, **kwargs)
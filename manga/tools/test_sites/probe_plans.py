@@ -0,0 +1,134 @@
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import TYPE_CHECKING
+from pathlib import Path
+import threading
+import json
+import time
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+    from typing import Any
+
+
+def _key(offset: float) -> str:
+    return f"{round(offset, 3):+g}"
+
+
+@dataclass(frozen=True)
+class Plan:
+    """
+    How to probe a domain this run
+    If not decimals, non-integer chapters are not probed; if not dashes, the dashed form of them is not tried
+    """
+
+    domain: str
+    decimals: bool = True
+    dashes: bool = True
+    hits: dict[str, int] = field(default_factory=dict)
+
+    def probes(self, x: float) -> bool:
+        """
+        Return true if chapter x should be probed
+        """
+        return self.decimals or int(x) == x
+
+    def order(self, offsets: Iterable[float]) -> list[float]:
+        """
+        Sort offsets so that the historically most successful come first
+        """
+        return sorted(offsets, key=lambda i: -self.hits.get(_key(i), 0))
+
+
+class ProbePlans:
+    """
+    Per-domain history of which probe variants found a chapter, stored on disk
+    A domain whose decimal chapters (or dashed decimal chapters) have never been found after
+    min_samples probes stops probing them, except for a full plan at least every refresh seconds
+    """
+
+    def __init__(
+        self,
+        path: Path = Path.home() / ".cache/manga_scrape/probe_plans.json",
+        min_samples: int = 100,
+        refresh: float = timedelta(days=14).total_seconds(),
+    ):
+        self.path: Path = path
+        self.min_samples: int = min_samples
+        self.refresh: float = refresh
+        self.enabled: bool = True
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, Any]] | None = None
+        self._plans: dict[str, Plan] = {}
+        self._saved: dict[str, int] = {}
+
+    def _stats(self, domain: str) -> dict[str, Any]:
+        if self._data is None:
+            self._data = json.loads(self.path.read_text()) if self.path.exists() else {}
+        return self._data.setdefault(domain, {"decimal": [0, 0], "dash": [0, 0], "offsets": {}, "full": 0.0})
+
+    def plan(self, domain: str) -> Plan:
+        """
+        Return the plan for domain for this run
+        """
+        with self._lock:
+            if (ret := self._plans.get(domain)) is not None:
+                return ret
+            stats = self._stats(domain)
+            if not self.enabled or time.time() - stats["full"] >= self.refresh:
+                stats["full"] = time.time()
+                ret = Plan(domain, hits=dict(stats["offsets"]))
+            else:
+                prune = lambda kind: stats[kind][0] >= self.min_samples and stats[kind][1] == 0
+                ret = Plan(domain, not prune("decimal"), not prune("dash"), dict(stats["offsets"]))
+            self._plans[domain] = ret
+            return ret
+
+    def record(self, domain: str, kind: str, hit: bool) -> None:
+        """
+        Record the result of probing a variant: either "decimal" or "dash"
+        """
+        with self._lock:
+            counts: list[int] = self._stats(domain)[kind]
+            counts[0] += 1
+            counts[1] += hit
+
+    def hit(self, domain: str, offset: float) -> None:
+        """
+        Record that the chapter offset from a URL's chapter was found
+        """
+        with self._lock:
+            offsets: dict[str, int] = self._stats(domain)["offsets"]
+            offsets[_key(offset)] = offsets.get(_key(offset), 0) + 1
+
+    def skipped(self, domain: str, count: int) -> None:
+        """
+        Record that the plan for domain avoided count requests
+        """
+        if count:
+            with self._lock:
+                self._saved[domain] = self._saved.get(domain, 0) + count
+
+    def save(self) -> None:
+        """
+        Write the learned statistics to disk
+        """
+        with self._lock:
+            if self._data is not None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp: Path = self.path.with_suffix(".tmp")
+                tmp.write_text(json.dumps(self._data, indent=1, sort_keys=True))
+                tmp.replace(self.path)
+
+    def report(self) -> str:
+        """
+        Summarize how many requests the learned plans saved this run
+        """
+        with self._lock:
+            if not self._saved:
+                return "Learned probe plans saved no requests"
+            lines = (f"\t{i}: {k}" for i, k in sorted(self._saved.items(), key=lambda x: -x[1]))
+            return f"Learned probe plans saved {sum(self._saved.values())} requests:\n" + "\n".join(lines)
+
+
+plans = ProbePlans()
@@ -0,0 +1,77 @@
+from pathlib import Path
+import threading
+import sqlite3
+import time
+
+_day: float = 24 * 60 * 60
+
+
+class ProbeStore:
+    """
+    A thread-safe on-disk store of whether each probed URL had a chapter
+    Results expire after positive_ttl or negative_ttl seconds, depending on the result
+    Chapters rarely disappear, so positive results may be kept much longer than negative ones
+    The database is not opened until first used
+    """
+
+    def __init__(
+        self,
+        path: Path = Path.home() / ".cache/manga_scrape/probes.sqlite3",
+        positive_ttl: float = 30 * _day,
+        negative_ttl: float = _day,
+    ):
+        self.path: Path = path
+        self.positive_ttl: float = positive_ttl
+        self.negative_ttl: float = negative_ttl
+        self.enabled: bool = True
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS probes (url TEXT PRIMARY KEY, found INTEGER, at REAL)")
+        return self._db
+
+    def get(self, url: str) -> bool | None:
+        """
+        Return the stored result for url, or None if there is no unexpired result
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            row = self._conn().execute("SELECT found, at FROM probes WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        found: bool = bool(row[0])
+        if time.time() - row[1] > (self.positive_ttl if found else self.negative_ttl):
+            return None
+        return found
+
+    def put(self, url: str, found: bool) -> None:
+        """
+        Store the result of probing url
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._conn().execute("INSERT OR REPLACE INTO probes VALUES (?, ?, ?)", (url, int(found), time.time()))
+
+    def close(self) -> None:
+        """
+        Drop expired results and close the database
+        """
+        with self._lock:
+            if self._db is not None:
+                now: float = time.time()
+                self._db.execute(
+                    "DELETE FROM probes WHERE (found AND at < ?) OR (NOT found AND at < ?)",
+                    (now - self.positive_ttl, now - self.negative_ttl),
+                )
+                self._db.close()
+                self._db = None
+
+
+probes = ProbeStore()
@@ -8,9 +8,9 @@ _untested = Untested()
 
 
 class URL:
-    def __init__(self, url: str) -> None:
+    def __init__(self, url: str, domain: str | None = None) -> None:
         self.url = url
-        self.domain = get_domain(url)
+        self.domain = get_domain(url) if domain is None else domain
         self.status: Status = _untested
 
     def __str__(self):
@@ -21,16 +21,23 @@ class URL:
 
 
 class State:
-    def __init__(self, urls: set[str]) -> None:
-        self._urls: list[URL] = [URL(i) for i in urls]
+    def __init__(self, urls: set[str] | dict[str, str]) -> None:
+        """
+        urls may map each URL to its domain
+        """
+        self._urls: list[URL] = [URL(i, urls[i] if isinstance(urls, dict) else None) for i in urls]
 
     def __len__(self) -> int:
         return len(self._urls)
 
-    def domains(self) -> dict[str, list[URL]]:
+    def domains(self, status_type: type[Status] = Status) -> dict[str, list[URL]]:
+        """
+        Bucket the URLs whose status is a status_type by domain
+        """
         bucketed = defaultdict(list)
         for i in self._urls:
-            bucketed[i.domain].append(i)
+            if isinstance(i.status, status_type):
+                bucketed[i.domain].append(i)
         return bucketed
 
     def get(self, status_type: type[Status]) -> list[URL]:
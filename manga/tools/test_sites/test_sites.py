@@ -1,48 +1,48 @@
-from typing import TYPE_CHECKING
+from datetime import timedelta
+from functools import partial
 from pathlib import Path
-from time import sleep
-import traceback
 
-from manga.utils import extract_url, lsf
+from manga.utils import library, Journal
+from manga import sites
 
-from .test_url import test_url
+from .probe_plans import plans
+from .probe_store import probes
+from .test_url import speculator, test_url, test_url_async
 from .dispatch import dispatch
 from .state import State, URL
-from .status import Skipped
+from .status import Status, Untested, Skipped, Success, Unknown, NotInt, HasVol, Pattern
+from .status import Tiny, Exists, Missing, Broken, PointFive
 from .results import results
 
-if TYPE_CHECKING:
-    from collections.abc import Callable
+_skipped = Skipped()
+# Statuses which do not depend on the arguments of the run nor on a transient failure
+_journaled: dict[str, type[Status]] = {
+    i.__name__: i for i in (Success, Unknown, NotInt, HasVol, Pattern, Tiny, Exists, Missing, Broken, PointFive)
+}
 
 
-_skipped = Skipped()
+def _record(journal: Journal, url: URL) -> None:
+    """
+    Journal the status of url, unless it may differ on another run
+    """
+    if (name := type(url.status).__name__) in _journaled:
+        journal.record(url.url, name)
 
 
-def evaluate_urls(urls: list[URL], update_pbar: Callable[[], None], skip: set[str], delay: int) -> None:
+def evaluate_url(url: URL, skip: set[str], speculative: bool) -> None:
     """
-    :param urls: The list of URLs to test
-    :param update_pbar: A function that updates the progress bar to be called when a URL is tested
+    :param url: The URL to test
     :param skip: A set of domains to skip
-    :param delay: How many seconds to sleep before testing successive urls
+    :param speculative: If true, the independent probes of each stage of testing url are made concurrently
+    """
+    url.status = _skipped if url.domain in skip else test_url(url.url, speculative)
+
+
+async def evaluate_url_async(url: URL, skip: set[str], engine: sites.Engine, speculative: bool) -> None:
+    """
+    evaluate_url, with requests made on the event loop of engine
     """
-    try:
-        if urls[0].domain in skip:
-            for i in urls:
-                i.status = _skipped
-                update_pbar()
-            return
-        first: bool = False
-        for url in urls:
-            if not first:
-                sleep(delay)
-                first = False
-            url.status = test_url(url.url)
-            update_pbar()
-    except KeyboardInterrupt:
-        raise
-    except:
-        traceback.print_exc()
-        raise
+    url.status = _skipped if url.domain in skip else await test_url_async(url.url, engine, speculative)
 
 
 def test_sites(
@@ -52,24 +52,102 @@ def test_sites(
     skip_tiny: bool,
     skip_point_five: bool,
     no_prompt: bool,
-    delay: int,
+    rate: float = 8.0,
+    burst: int = 8,
+    engine: str = "threads",
+    workers: int = 32,
+    per_domain: int = 8,
+    speculative: bool = False,
+    full_plan: bool = False,
+    pool_size: int = 32,
+    no_cache: bool = False,
+    positive_ttl: float = 30,
+    negative_ttl: float = 1,
+    host_override: str | None = None,
+    report: Path | None = None,
+    prometheus: Path | None = None,
+    resume: bool = False,
+    no_warm_up: bool = False,
+    no_head: bool = False,
 ) -> bool:
     """
     Test each file in directory, print the results open them as needed
+    engine selects whether requests are made from the worker threads or from a shared asyncio event loop
+    URLs are tested by a pool of worker threads, or all on the event loop if engine is async,
+    at most per_domain of any one domain at once
+    If speculative, the independent probes of each stage of testing a URL are made concurrently,
+    at most per_domain of any one domain at once
+    Unless full_plan, probes each domain has never needed are pruned
+    pool_size is the number of connections kept alive per host
+    If no_cache, neither the HTTP cache nor the probe store are used or updated
+    Probe results are reused for positive_ttl / negative_ttl days, depending on the result
+    Requests to each domain are limited to rate per second, with bursts of up to burst requests
+    If host_override, every request is sent to that host instead, e.g. to manga.tools.mock_sites;
+    the HTTP cache, probe store, probe plans and HEAD support it learns are kept apart, see HostOverride.scratch
+    Metrics of every request are saved as JSON to report (by default a new file in sites.metrics.directory)
+    and, if prometheus, as a Prometheus textfile to prometheus
+    Statuses are journaled as they are found; if resume, those journaled by an interrupted run are reused
+    Unless no_warm_up, every host is resolved and connected to before the sweep starts
+    Either way, DNS answers are memoized until the sweep ends, see sites.Resolver
+    Unless no_head, status-only domains whose HEAD responses agree with their GETs are sent HEADs instead
     """
     skip = {i.split("://")[-1].split("/")[0] for i in skip}
     print("Checking arguments...")
     assert all("." in i for i in skip), "Non-domain in --skip"
     assert not any("http://" in i for i in skip), "http:// in --skip"
     directory = directory.resolve()
-    assert delay >= 0, "Delay may not be negative"
+    assert rate > 0 and burst > 0, "Rate and burst must be positive"
     assert directory.exists(), f"{directory} does not exist"
     assert directory.is_dir(), f"{directory} is not a directory"
     # Test
     print("Scanning files...")
-    state = State({extract_url(i) for i in lsf(directory)})
-    print(f"Testing {len(state)} urls...")
-    dispatch(state, evaluate_urls, skip, delay)
+    state = State({i.url: i.domain for i in library(directory).values()})
+    journal = Journal("test-sites", directory)
+    resumed: dict[str, str] = journal.open(resume)
+    for i in state.get(Untested):
+        if (name := resumed.get(i.url)) in _journaled:
+            i.status = _journaled[name]()
+    if resume:
+        print(f"Resuming with {len(state) - len(state.get(Untested))} statuses from {journal.path}")
+    print(f"Testing {len(state.get(Untested))} urls...")
+    sites.cache.enabled = probes.enabled = not no_cache
+    sites.heads.enabled = not no_head
+    sites.limiter.configure(rate, burst)
+    sites.override.configure(host_override)
+    for i in (sites.cache, sites.heads, probes, plans):
+        i.path = sites.override.scratch(i.path)
+    plans.enabled = not full_plan
+    speculator.per_domain = per_domain
+    probes.positive_ttl = timedelta(days=positive_ttl).total_seconds()
+    probes.negative_ttl = timedelta(days=negative_ttl).total_seconds()
+    sites.metrics.begin()
+    record = partial(_record, journal)
+    warm = [i.url for i in state.get(Untested) if i.domain not in skip]
+    if engine == "async":
+        with sites.resolver, sites.Engine(per_domain=per_domain) as eng:
+            if not no_warm_up:
+                sites.warm_up(warm, eng, workers=workers)
+            args = (skip, eng, speculative)
+            dispatch(
+                state, evaluate_url_async, *args, workers=workers, per_domain=per_domain, engine=eng, finish=record
+            )
+    else:
+        sites.pool.resize(pool_size)
+        with sites.resolver:
+            if not no_warm_up:
+                sites.warm_up(warm, workers=workers)
+            dispatch(state, evaluate_url, skip, speculative, workers=workers, per_domain=per_domain, finish=record)
+        print(sites.pool.summary())
+    journal.close(complete=not state.get(Untested))
+    sites.cache.close()
+    sites.heads.save()
+    probes.close()
+    plans.save()
+    print(plans.report())
+    print(sites.metrics.summary())
+    print(f"Saved the run report to {sites.metrics.save(report, 'test-sites')}")
+    if prometheus is not None:
+        sites.metrics.prometheus(prometheus)
     # Results
     results(state, no_prompt, skip_tiny, skip_point_five, opener)
     return True
@@ -1,12 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from typing import TYPE_CHECKING, NamedTuple
 from re import IGNORECASE, match
-from functools import cache
-from time import sleep
+from functools import partial
+import threading
+import asyncio
 
 import requests
 
 from manga.utils import split_on_num
 from manga import sites
 
+from .probe_plans import Plan, plans
+from .probe_store import probes
 from .status import (
     Success,
     Tested,
@@ -22,30 +27,281 @@ from .status import (
     PointFive,
 )
 
+if TYPE_CHECKING:
+    from collections.abc import Awaitable, Callable, Generator, Iterable, Mapping
+    from concurrent.futures import Future
+
+    # A probe yields the URLs it needs tested and is sent whether each was found and needed a request
+    _Probe = Generator[str, tuple[bool, bool], bool]
+    # A decision yields the stages it needs run and is sent whether each passed
+    _Decision = Generator["_Stage", bool, Tested]
+
+
 _success = Success()
+_found: dict[str, bool] = {}  # The result of each URL tested this run
 
 
-@cache
-def _test_site(url: str) -> bool:
-    return sites.test(url, timeout_retries=8)
+def _drive[Y, S, R](gen: Generator[Y, S, R], step: Callable[[Y], S]) -> R:
+    """
+    Run gen to completion, answering each value it yields with step
+    """
+    try:
+        request: Y = next(gen)
+        while True:
+            request = gen.send(step(request))
+    except StopIteration as e:
+        return e.value
+
+
+async def _drive_async[Y, S, R](gen: Generator[Y, S, R], step: Callable[[Y], Awaitable[S]]) -> R:
+    """
+    _drive, awaiting each answer
+    """
+    try:
+        request: Y = next(gen)
+        while True:
+            request = gen.send(await step(request))
+    except StopIteration as e:
+        return e.value
+
+
+def _known(url: str) -> bool | None:
+    """
+    Return the result of url if this run or the probe store already has an unexpired one, else None
+    """
+    if (ret := _found.get(url)) is None and (ret := probes.get(url)) is not None:
+        _found[url] = ret
+    return ret
+
+
+def _remember(url: str, found: bool) -> bool:
+    _found[url] = found
+    probes.put(url, found)
+    return found
+
+
+def _test_site(url: str, stop: threading.Event | None = None) -> tuple[bool, bool]:
+    """
+    Test url with the threaded engine, unless its result is already known
+    Return whether url was found and whether a request was made to find out
+    If stop is set, raise CancelledError rather than make a request
+    """
+    if (found := _known(url)) is not None:
+        return found, False
+    if stop is not None and stop.is_set():
+        raise CancelledError()
+    return _remember(url, sites.test(url, timeout_retries=8)), True
 
 
-def _test(left: str, right: str, x: float) -> bool:
+async def _test_site_async(engine: sites.Engine, url: str) -> tuple[bool, bool]:
     """
-    Test if chapter x is found at a URL constructed from left, right, and x
+    Test url on the event loop of engine, unless its result is already known
+    Return whether url was found and whether a request was made to find out
+    The probe store is read and written from another thread so as not to block the event loop
+    """
+    if (found := _found.get(url)) is None and (found := await asyncio.to_thread(_known, url)) is None:
+        found = await engine.test(url, timeout_retries=8)
+        await asyncio.to_thread(_remember, url, found)
+        return found, True
+    return found, False
+
+
+def _test(left: str, right: str, x: float, plan: Plan) -> _Probe:
+    """
+    Probe if chapter x is found at a URL constructed from left, right, and x
+    Decimal chapters are also tried in their dashed form, unless plan says not to
+    Only results which needed a request are recorded in the domain's probe plan, so each is counted once
     """
     if int(x) == x:
-        return _test_site(f"{left}{int(x)}{right}")
-    else:
-        if _test_site(f"{left}{x}{right}"):
+        return (yield f"{left}{int(x)}{right}")[0]
+    found, requested = yield f"{left}{x}{right}"
+    if not found:
+        if plan.dashes:
+            found, dashed = yield f"{left}{str(x).replace('.', '-')}{right}"
+            if dashed:
+                plans.record(plan.domain, "dash", found)
+            requested |= dashed
+        else:
+            plans.skipped(plan.domain, 1)
+    if requested:
+        plans.record(plan.domain, "decimal", found)
+    return found
+
+
+class _Stage(NamedTuple):
+    """
+    Chapters to probe, each paired with the result that lets the stage pass; the first mismatch fails it
+    learn maps chapters to the offsets to record hits of, see _Prober.probe
+    """
+
+    checks: tuple[tuple[float, bool], ...]
+    learn: Mapping[float, float]
+
+
+class Speculator:
+    """
+    The thread pool speculative probes of the threaded engine are made on
+    At most per_domain probes of each domain are submitted at once, like dispatch's limit of URLs per domain;
+    once a domain is at its limit, submitting another probe blocks until one of them is done
+    The Engine bounds the requests of each domain itself, so async probes need no such limit
+    """
+
+    def __init__(self, workers: int = 64, per_domain: int = 8) -> None:
+        self.workers: int = workers
+        self.per_domain: int = per_domain
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self._budgets: dict[str, threading.Semaphore] = {}
+
+    def _budget(self, domain: str) -> threading.Semaphore:
+        with self._lock:
+            if (ret := self._budgets.get(domain)) is None:
+                ret = self._budgets[domain] = threading.Semaphore(self.per_domain)
+            return ret
+
+    def submit[T](self, domain: str, fn: Callable[[], T]) -> Future[T]:
+        """
+        Call fn in the pool once domain is within its limit and return its future
+        """
+        budget = self._budget(domain)
+        budget.acquire()
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="probe")
+        ret = self._pool.submit(fn)
+        ret.add_done_callback(lambda _: budget.release())
+        return ret
+
+
+speculator = Speculator()
+
+
+class _Prober:
+    """
+    Decides the status of a URL constructed from left, right, and its chapter n, one stage of probes at a time
+    The decision is shared by both engines; each runs its stages with its own driver:
+    run makes requests from the calling thread, run_async makes them on the event loop of engine
+    Chapters the domain's probe plan prunes are assumed not to exist
+    If speculative, every probe of a stage is started at once, as threads or as tasks on the event loop;
+    they are still resolved in order, so the outcome (or exception raised) is that of testing them sequentially
+    Once a stage is decided its outstanding probes are cancelled: async probes at once, and probe threads
+    before their next request, as a request a thread has already started cannot be interrupted
+    """
+
+    def __init__(self, url: str, speculative: bool, engine: sites.Engine | None = None) -> None:
+        left, self._n, right = split_on_num(url)
+        self._args = (left, right)
+        self._speculative: bool = speculative
+        self._engine: sites.Engine | None = engine
+        self._plan: Plan = plans.plan(sites.get_domain(url))
+
+    def probe(self, x: float, learn: Mapping[float, float]) -> _Probe:
+        """
+        Probe chapter x; if it is found and learn maps it to an offset, record that offset's hit
+        """
+        found: bool = yield from _test(*self._args, x, self._plan)
+        if found and x in learn:
+            plans.hit(self._plan.domain, learn[x])
+        return found
+
+    def _kept(self, stage: _Stage) -> tuple[tuple[float, bool], ...] | None:
+        """
+        Return the checks of stage the domain's probe plan does not prune, or None if pruning decides it
+        """
+        kept = tuple((x, want) for x, want in stage.checks if self._plan.probes(x))
+        plans.skipped(self._plan.domain, len(stage.checks) - len(kept))
+        if any(want for x, want in stage.checks if not self._plan.probes(x)):  # Pruned chapters are assumed missing
+            return None
+        return kept
+
+    def run(self, stage: _Stage) -> bool:
+        """
+        Return true if stage passes, making its requests from the calling thread or, if speculative, from probe threads
+        """
+        if (kept := self._kept(stage)) is None:
+            return False
+        if not self._speculative or len(kept) < 2:
+            return all(_drive(self.probe(x, stage.learn), _test_site) == want for x, want in kept)
+        stop = threading.Event()
+        site = partial(_test_site, stop=stop)
+        futures: list[Future[bool]] = []
+        try:
+            for x, _ in kept:
+                futures.append(speculator.submit(self._plan.domain, partial(_drive, self.probe(x, stage.learn), site)))
+            return all(f.result() == want for f, (_, want) in zip(futures, kept))
+        finally:
+            stop.set()
+            for f in futures:
+                f.cancel()
+
+    async def run_async(self, stage: _Stage) -> bool:
+        """
+        Return true if stage passes, making its requests on the event loop of engine
+        """
+        assert self._engine is not None, "An engine is required to run stages asynchronously"
+        if (kept := self._kept(stage)) is None:
+            return False
+        site = partial(_test_site_async, self._engine)
+        if not self._speculative or len(kept) < 2:
+            for x, want in kept:
+                if await _drive_async(self.probe(x, stage.learn), site) != want:
+                    return False
+            return True
+        tasks = [asyncio.ensure_future(_drive_async(self.probe(x, stage.learn), site)) for x, _ in kept]
+        try:
+            for t, (_, want) in zip(tasks, kept):
+                if await t != want:
+                    return False
             return True
-        return _test_site(f"{left}{str(x).replace('.', '-')}{right}")
+        finally:
+            for t in tasks:
+                if not t.cancel() and not t.cancelled():
+                    t.exception()  # The stage was decided without it, so its error need not be reported
+
+    @staticmethod
+    def all(checks: Iterable[tuple[float, bool]], learn: Mapping[float, float] | None = None) -> _Decision:
+        """
+        Return true if testing each chapter yields its paired value
+        """
+        return (yield _Stage(tuple(checks), {} if learn is None else learn))
+
+    def test(self, x: float) -> _Decision:
+        return (yield from self.all(((x, True),)))
 
+    def any(self, xs: Iterable[float], learn: Mapping[float, float] | None = None) -> _Decision:
+        """
+        Return true if any chapter is found; the first hit decides the stage
+        """
+        return not (yield from self.all(((x, False) for x in xs), learn))
 
-# pylint: disable=too-many-return-statements,too-many-branches
-def test_url(url: str) -> Tested:
+    def any_next(self, offsets: Iterable[float]) -> _Decision:
+        """
+        Return true if any chapter n + offset is found
+        The offsets which most often found chapters on this domain are tried first, and hits are recorded
+        """
+        learn: dict[float, float] = {self._n + i: i for i in offsets}
+        return (yield from self.any((self._n + i for i in self._plan.order(learn.values())), learn))
+
+    def decide(self) -> _Decision:
+        """
+        The probing half of test_url's decision tree
+        """
+        n: float = self._n
+        if (yield from self.all(((n, True), (n - 1, False), (5, False)))):
+            return Exists()
+        if not (yield from self.test(n)):
+            if (yield from self.any_next((0.1, 0.5, 1, 1.1, 2, 2.1, 5, 10, 20))):
+                return Missing()
+            if (yield from self.test(n - 0.5)):
+                return PointFive()
+        if not (yield from self.any((n, n - 1, 5, n + 0.1, n + 0.5, n - 0.5, n + 1, n + 1.1, n + 5))):
+            return Broken()
+        return _success
+
+
+def _screen(url: str) -> Tested | None:
     """
-    If url is broken, return a failure class for it
+    Return the status of url if it can be decided without probing, else None
     """
     if match(r"vol[^a-z\d]", url, IGNORECASE) or match(r"[^a-z\d]vol", url, IGNORECASE):
         return HasVol()
@@ -56,24 +312,43 @@ def test_url(url: str) -> Tested:
         return Tiny()
     elif "mangabuddy" in left and ("/mbx" in left or any(i.isalpha() for i in right)):
         return Pattern()
-    test = lambda x: _test(left, right, x)
-    try:
-        if test(n) and not test(n - 1) and not test(5):
-            return Exists()
-        sleep(0.04)  # No DOS-ing
-        if not test(n):
-            if any(test(n + i) for i in (0.1, 0.5, 1, 1.1, 2, 2.1, 5, 10, 20)):
-                return Missing()
-            sleep(0.08)  # No DOS-ing
-            if test(n - 0.5):
-                return PointFive()
-        sleep(0.01)  # No DOS-ing
-        if not any(test(i) for i in (n, n - 1, 5, n + 0.1, n + 0.5, n - 0.5, n + 1, n + 1.1, n + 5)):
-            return Broken()
-        sleep(0.04)  # No DOS-ing
-        return _success
-    except sites.UnknownDomain:
+    return None
+
+
+def _failed(e: Exception) -> Tested:
+    """
+    The status of a URL whose probing raised e
+    """
+    if isinstance(e, sites.UnknownDomain):
         return Unknown()
-    except requests.exceptions.RequestException as e:
-        print(e)
-        return BadRequest(e)
+    print(e)
+    return BadRequest(e)
+
+
+def test_url(url: str, speculative: bool = False) -> Tested:
+    """
+    If url is broken, return a failure class for it
+    Requests are made from the calling thread
+    If speculative, the independent probes of each stage are made concurrently
+    Probes are ordered and pruned according to the domain's learned probe plan
+    """
+    if (ret := _screen(url)) is not None:
+        return ret
+    probe = _Prober(url, speculative)
+    try:
+        return _drive(probe.decide(), probe.run)
+    except (sites.UnknownDomain, requests.exceptions.RequestException) as e:
+        return _failed(e)
+
+
+async def test_url_async(url: str, engine: sites.Engine, speculative: bool = False) -> Tested:
+    """
+    test_url, with every request made on the event loop of engine, which this must be awaited on
+    """
+    if (ret := _screen(url)) is not None:
+        return ret
+    probe = _Prober(url, speculative, engine)
+    try:
+        return await _drive_async(probe.decide(), probe.run_async)
+    except (sites.UnknownDomain, requests.exceptions.RequestException) as e:
+        return _failed(e)
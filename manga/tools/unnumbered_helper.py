@@ -1,13 +1,17 @@
+from typing import TYPE_CHECKING
 from pathlib import Path
 import collections
 import argparse
 import platform
 import time
+import math
 import os
 
-import osascript
+from manga.utils import split_many, library, serving, find, get_logger
+from manga.sites import get_domain
 
-from manga.utils import split_on_num, extract_url, lsf, get_logger
+if TYPE_CHECKING:
+    from manga.utils import Record
 
 BROWSER = os.getenv("BROWSER", "Brave Browser")
 
@@ -26,28 +30,56 @@ def scrub(url: str) -> str:
     return url
 
 
+def _swap(f: Path) -> bool:
+    """
+    Ignore .swp files but whine about them
+    """
+    if f.name.startswith(".") and f.suffix == ".swp":
+        print(f"Refusing to open swap file: {f}")
+        return True
+    return False
+
+
+def _chapters(records: dict[Path, Record]) -> dict[str, str]:
+    """
+    Map the scrubbed URLs of records to the chapter numbers of their files as strings
+    """
+    names = split_many(i.name for i in records)
+    ret: dict[str, str] = {}
+    for (f, rec), num in zip(records.items(), names.number):
+        if math.isnan(num):
+            raise ValueError(f"There is no number in {f.name}")
+        ret[scrub(rec.url)] = str(num)
+    return ret
+
+
 def read_dir(directory: Path) -> dict[str, str]:
     """
     Read a directory and map the scrubbed URLs to their chapter numbers a strings
-    Ignores .swp files but whines about them
     """
     assert directory.is_dir(), f"{directory} is a file"
-    files: list[Path] = lsf(directory)
-    ret: dict[str, str] = {}
-    for f in files:
-        fname: str = f.name
-        if fname.startswith(".") and f.suffix == ".swp":
-            print(f"Refusing to open swap file: {f}")
-            continue
-        _, num, _2 = split_on_num(fname)
-        ret[scrub(extract_url(f))] = str(num)
-    return ret
+    return _chapters(library(directory, exclude=_swap))
+
+
+def lookup(dirs: list[Path], url: str) -> str | None:
+    """
+    Ask the library daemon for the chapter number of the file in dirs whose URL scrubs to the same as url
+    Only the files of url's domain are asked for and compared
+    """
+    key: str = scrub(url)
+    for i in dirs:
+        records = {f: rec for f, rec in find(i, "domain", get_domain(url)).items() if not _swap(f)}
+        if (found := _chapters(records).get(key)) is not None:
+            return found
+    return None
 
 
 def get_url() -> str:
     """
     Get the URL of the current tab
     """
+    import osascript  # pylint: disable=import-outside-toplevel
+
     cmd: str = f'tell application "{BROWSER}" to return URL of active tab of front window'
     code, out, err = osascript.run(cmd)
     assert code == 0, err
@@ -62,19 +94,19 @@ def unnumbered_helper(dirs: list[Path]) -> None:
     for i in dirs:
         assert i.exists(), f"{i} does not exist"
     get_logger(__name__).info("Running on dirs: %s", dirs)
-    raw_data: list[dict[str, str]] = [read_dir(i) for i in dirs]
-    data: dict[str, str] = dict(collections.ChainMap(*raw_data))
+    # While the library daemon runs it keeps up with changes to dirs, otherwise they are read once
+    data: dict[str, str] | None = None
+    if not serving():
+        data = dict(collections.ChainMap(*(read_dir(i) for i in dirs)))
     old: str | None = None
     while True:
         time.sleep(0.05)
-        url: str = scrub(get_url())
+        url: str = get_url()
         if url == old:
             continue
         old = url
-        try:
-            print(data[url])
-        except KeyError:
-            print("Unknown")
+        found: str | None = lookup(dirs, url) if data is None else data.get(scrub(url))
+        print("Unknown" if found is None else found)
 
 
 def cli() -> None:
@@ -2,7 +2,7 @@ from pathlib import Path
 import argparse
 import sys
 
-from manga.utils import split_on_num, mv
+from manga.utils import split_on_num, mismatched, mv
 
 
 def up_number(file: Path, number: int, yes: bool, force: bool) -> bool:
@@ -36,6 +36,25 @@ def up_number(file: Path, number: int, yes: bool, force: bool) -> bool:
     return False
 
 
+def sync(directory: Path, yes: bool, force: bool) -> bool:
+    """
+    up_number each .webloc file in directory whose name's chapter differs from its URL's to its URL's chapter
+    Return true if every such file was renamed
+    """
+    ok: bool = True
+    for f, rec in mismatched(directory).items():
+        if rec.split is None or f.suffix != ".webloc" or not any(c.isdigit() for c in f.name):
+            print(f"Skipping {f}: its name or URL has no chapter number")
+            ok = False
+            continue
+        try:
+            ok &= up_number(f, rec.split[1], yes, force)
+        except AssertionError as e:  # A refused rename should not stop the rest of the sync
+            print(f"Skipping {f}: {e}")
+            ok = False
+    return ok
+
+
 def cli() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument(
@@ -44,6 +63,17 @@ def cli() -> None:
     parser.add_argument(
         "-f", "--force", action="store_true", help="Allow changes even if the chapter number does not increase"
     )
-    parser.add_argument("file", type=Path, help="The file to increase the number of")
-    parser.add_argument("number", type=float, help="The number to increment file to")
-    sys.exit(0 if up_number(**vars(parser.parse_args())) else -1)
+    parser.add_argument(
+        "file",
+        type=Path,
+        help="The file to increase the number of, or a directory to sync the names of with their URLs",
+    )
+    parser.add_argument("number", type=float, nargs="?", help="The number to increment file to")
+    args = parser.parse_args()
+    if args.file.is_dir():
+        if args.number is not None:
+            parser.error("number may not be given with a directory")
+        sys.exit(0 if sync(args.file, args.yes, args.force) else -1)
+    if args.number is None:
+        parser.error("number is required with a file")
+    sys.exit(0 if up_number(**vars(args)) else -1)
@@ -1,5 +1,26 @@
-from .split_on_num import split_on_num
+from typing import TYPE_CHECKING
+
+from .split_on_num import *
 from .redirect_print_to_tqdm import *
 from .extract_url import *
-from .log import get_logger
+from .scrub import *
 from .files import *
+from .library import *
+from .journal import *
+
+if TYPE_CHECKING:
+    from typing import Any
+
+    from .log import get_logger
+
+
+def __getattr__(name: str) -> Any:
+    """
+    get_logger is imported on first use, as its dependencies are slow to import
+    """
+    if name != "get_logger":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from .log import get_logger  # pylint: disable=import-outside-toplevel
+
+    globals()["get_logger"] = get_logger
+    return get_logger
@@ -1,6 +1,8 @@
 from collections.abc import Iterable
 from pathlib import Path
 
+from .library import INDEX_NAME
+
 __all__ = ("lsf", "mv")
 
 
@@ -9,7 +11,7 @@ def lsf(d: Path) -> list[Path]:
     ls all files in d recursively, but ignore likely undesired files
     """
     each: Iterable[Path] = (i.resolve() for i in d.resolve().rglob("*"))
-    ignore: set[str] = {".DS_Store"}
+    ignore: set[str] = {".DS_Store", INDEX_NAME}
     return [i for i in each if i.is_file() and i.name not in ignore]
 
 
@@ -0,0 +1,77 @@
+from typing import TYPE_CHECKING
+from pathlib import Path
+import threading
+import hashlib
+import json
+import os
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+__all__ = ("Journal",)
+
+
+class Journal:
+    """
+    An append-only record of the outcome of each URL a tool's sweep of a directory has tested
+    Each outcome is flushed as it is recorded, so a sweep interrupted or crashed may later be resumed
+    Lines cut short by a crash are ignored and the last outcome recorded for a URL wins
+    The journal is removed once its sweep completes
+    """
+
+    def __init__(self, tool: str, directory: Path, root: Path = Path.home() / ".cache/manga_scrape/journals") -> None:
+        digest: str = hashlib.sha1(str(directory.resolve()).encode()).hexdigest()[:16]
+        self.path: Path = root / f"{tool}-{digest}.jsonl"
+        self._lock = threading.RLock()  # The SIGINT handler may record while the main thread holds it
+        self._file: TextIO | None = None
+
+    def load(self) -> dict[str, str]:
+        """
+        Return the outcome recorded for each URL
+        """
+        ret: dict[str, str] = {}
+        try:
+            lines: list[str] = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return ret
+        for line in lines:
+            try:
+                url, outcome = json.loads(line)
+            except ValueError, TypeError:  # Cut short
+                continue
+            ret[url] = outcome
+        return ret
+
+    def open(self, resume: bool) -> dict[str, str]:
+        """
+        Start recording outcomes; if resume, return those already recorded, otherwise discard them
+        """
+        ret: dict[str, str] = self.load() if resume else {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            self._file = self.path.open("a" if resume else "w")
+            if self._file.tell() and not self.path.read_bytes().endswith(b"\n"):
+                self._file.write("\n")  # Do not append to a line cut short
+        return ret
+
+    def record(self, url: str, outcome: str) -> None:
+        """
+        Record the outcome of url
+        """
+        line: str = json.dumps([url, outcome]) + "\n"
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self, complete: bool) -> None:
+        """
+        Stop recording; if complete, the sweep finished so the journal is removed
+        """
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        if complete:
+            self.path.unlink(missing_ok=True)
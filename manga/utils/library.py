@@ -0,0 +1,199 @@
+from typing import TYPE_CHECKING, NamedTuple
+from pathlib import Path
+import socket
+import json
+import os
+
+from .split_on_num import split_on_num, split_many
+from .extract_url import extract_url
+from .scrub import scrub
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable, Iterator
+    from typing import Any
+
+__all__ = ("INDEX_NAME", "SOCKET", "Record", "scan", "library", "serving", "find", "candidates", "mismatched")
+
+
+INDEX_NAME: str = ".manga_index.json"
+SOCKET: Path = Path.home() / ".cache/manga_scrape/library.sock"
+# Bump whenever the format of the index or of the Records in it change, such as the key scrub makes or split
+# An index saved by different code is then discarded rather than trusted
+INDEX_VERSION: int = 3
+_ignore: set[str] = {".DS_Store", INDEX_NAME, INDEX_NAME + ".tmp"}
+
+
+class Record(NamedTuple):
+    """
+    What is known about a file in a library
+    split is the split_on_num of url, or None if it contains no number
+    key is scrub of url
+    """
+
+    url: str
+    split: tuple[str, float, str] | None
+    domain: str
+    key: str
+
+    def row(self) -> list[Any]:
+        """
+        This record as a JSON serializable list
+        """
+        return [self.url, None if self.split is None else list(self.split), self.domain, self.key]
+
+    @classmethod
+    def from_row(cls, row: list[Any]) -> Record:
+        url, split, domain, key = row
+        return cls(url, None if split is None else tuple(split), domain, key)
+
+
+def _walk(d: str) -> Iterator[tuple[str, os.stat_result]]:
+    """
+    Yield the path of each file in d recursively with its stat
+    Symlinked files are resolved, symlinked directories are not followed
+    Paths are kept as str since pathlib is comparatively slow
+    """
+    with os.scandir(d) as it:
+        for i in it:
+            if i.is_dir(follow_symlinks=False):
+                yield from _walk(i.path)
+            elif i.name not in _ignore and i.is_file():
+                yield (os.path.realpath(i.path) if i.is_symlink() else i.path), i.stat()
+
+
+def _parse(file: Path) -> Record:
+    from manga.sites import get_domain  # pylint: disable=import-outside-toplevel
+
+    url: str = extract_url(file)
+    try:
+        split: tuple[str, float, str] | None = split_on_num(url)
+    except ValueError:
+        split = None
+    return Record(url, split, get_domain(url), scrub(url))
+
+
+def _load(index: Path) -> dict[str, list[Any]]:
+    try:
+        data = json.loads(index.read_text())
+    except FileNotFoundError, ValueError:
+        return {}
+    return data["files"] if data.get("version") == INDEX_VERSION else {}
+
+
+def _save(index: Path, files: dict[str, list[Any]]) -> None:
+    tmp: Path = index.with_name(index.name + ".tmp")
+    try:
+        tmp.write_text(json.dumps({"version": INDEX_VERSION, "files": files}, separators=(",", ":")))
+        tmp.replace(index)
+    except OSError as e:
+        print(f"Failed to save library index: {e}")
+
+
+def scan(d: Path) -> dict[Path, Record | None]:
+    """
+    Map each file in d recursively (as lsf would find them) to the Record of its contents, or None if unparsable
+    Records are kept in an index file in d, keyed by each file's path, mtime, size, and inode
+    Only files that are new or have changed since the index was last saved are read
+    """
+    d = d.resolve()
+    index: Path = d / INDEX_NAME
+    old: dict[str, list[Any]] = _load(index)
+    new: dict[str, list[Any]] = {}
+    ret: dict[Path, Record | None] = {}
+    for name, st in _walk(str(d)):
+        path = Path(name)
+        stamp: list[int] = [st.st_mtime_ns, st.st_size, st.st_ino]
+        if (row := old.get(name)) is not None and row[:3] == stamp:
+            ret[path] = Record.from_row(row[3:])
+        else:
+            try:
+                ret[path] = _parse(path)
+            except Exception:  # pylint: disable=broad-exception-caught
+                ret[path] = None
+                continue
+        new[name] = stamp + ret[path].row()
+    if new != old:
+        _save(index, new)
+    return ret
+
+
+def serving() -> bool:
+    """
+    Return true if the library daemon is running
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        return sock.connect_ex(str(SOCKET)) == 0
+
+
+def _ask(request: dict[str, str]) -> dict[str, list[Any] | None] | None:
+    """
+    Send request to the library daemon and return the rows of the records it replies with
+    Returns None if the daemon is not running or failed
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(60)
+            sock.connect(str(SOCKET))
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            sock.shutdown(socket.SHUT_WR)
+            data: bytes = b"".join(iter(lambda: sock.recv(1 << 20), b""))
+        reply = json.loads(data)
+    except OSError, ValueError:
+        return None
+    if "error" in reply:
+        print(f"Library daemon failed: {reply['error']}")
+        return None
+    return reply["result"]
+
+
+def library(d: Path, exclude: Callable[[Path], bool] | None = None) -> dict[Path, Record]:
+    """
+    Map each file in d recursively (as lsf would find them) to the Record of its contents
+    The records are served by the library daemon if it is running, otherwise d is scanned
+    Files for which exclude returns true are omitted; unparsable files raise their error as extract_url would
+    """
+    d = d.resolve()
+    records: Iterable[tuple[Path, Record | None]]
+    if (rows := _ask({"op": "library", "dir": str(d)})) is None:
+        records = scan(d).items()
+    else:
+        records = ((Path(i), None if k is None else Record.from_row(k)) for i, k in rows.items())
+    ret: dict[Path, Record] = {}
+    for path, rec in records:
+        if exclude is None or not exclude(path):
+            ret[path] = _parse(path) if rec is None else rec
+    return ret
+
+
+def find(d: Path, field: str, value: str) -> dict[Path, Record]:
+    """
+    Map each parsable file in d whose record's field equals value to its Record
+    For example, the files with a given key (scrubbed URL) or the URLs of a given domain
+    The lookup is made by the library daemon if it is running, otherwise d is scanned
+    """
+    assert field in Record._fields, f"Unknown field: {field}"
+    d = d.resolve()
+    rows = _ask({"op": "find", "dir": str(d), "field": field, "value": value})
+    if rows is None:
+        return {i: k for i, k in scan(d).items() if k is not None and getattr(k, field) == value}
+    return {Path(i): Record.from_row(k) for i, k in rows.items() if k is not None}
+
+
+def candidates(d: Path, key: str) -> dict[Path, Record] | None:
+    """
+    Map each file in d whose key manga.tools.guess would consider for the scrubbed URL key to its Record
+    Returns None if the library daemon is not running, as the candidates index is then left to the caller
+    """
+    rows = _ask({"op": "candidates", "dir": str(d.resolve()), "key": key})
+    return None if rows is None else {Path(i): Record.from_row(k) for i, k in rows.items() if k is not None}
+
+
+def mismatched(d: Path) -> dict[Path, Record]:
+    """
+    Map each file in d whose name's chapter differs from its URL's chapter to its Record
+    """
+    records: dict[Path, Record] = library(d)
+    paths: list[Path] = list(records)
+    names = split_many(i.name for i in paths)
+    urls = split_many(i.url for i in records.values())
+    return {paths[i]: records[paths[i]] for i in names.differ(urls)}
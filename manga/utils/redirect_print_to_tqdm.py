@@ -1,9 +1,10 @@
 import contextlib
-import inspect
-import tqdm
+import builtins
 
 
 def _print(obj, **kwargs):
+    import tqdm  # pylint: disable=import-outside-toplevel
+
     tqdm.tqdm.write(obj if isinstance(obj, str) else str(obj))
 
 
@@ -11,7 +12,7 @@ def _print(obj, **kwargs):
 def redirect_print_to_tqdm():
     old = print
     try:
-        inspect.builtins.print = _print
+        builtins.print = _print
         yield
     finally:
-        inspect.builtins.print = old
+        builtins.print = old
@@ -0,0 +1,50 @@
+from collections.abc import Iterable
+from functools import lru_cache
+import re
+
+__all__ = ("remove_unwanted_periods", "scrub", "scrub_many")
+
+
+_prefix = re.compile(r"https?://www?\d*\.")
+_digit = re.compile(r"\d")
+_junk = re.compile(r"[^a-z\. \d]+")
+# A run of periods is kept, as one period, only between two digits
+_periods = re.compile(r"(\.)(?<=\d\.)\.*(?=\d)|\.+")
+
+
+def remove_unwanted_periods(x: str) -> str:
+    """
+    Remove periods that are not part of a number
+    Numbers are assumed to start and end with a digit, not a decimal point
+    """
+    return _periods.sub(r"\1", x)
+
+
+@lru_cache(maxsize=1 << 16)
+def scrub(x: str, *, remove_numbers: bool = False) -> str:
+    """
+    Scrub a URL clean of 'mucky' information that makes it hard to compare with others
+    For example: remove 'www.' since not all URLs need this
+    """
+    # Trim
+    x = x.split("?", 1)[0].split("#", 1)[0]
+
+    # Remove unimportant words
+    x = _prefix.sub("", x.lower())
+    x = x.replace("https", "").replace("http", "").replace("www", "")
+
+    # If remove numbers
+    if remove_numbers:
+        x = _digit.sub("", x)
+
+    # Clean
+    x = _junk.sub(" ", x)
+    x = remove_unwanted_periods(x)
+    return " ".join(x.split())
+
+
+def scrub_many(xs: Iterable[str], *, remove_numbers: bool = False) -> list[str]:
+    """
+    scrub each URL in xs
+    """
+    return [scrub(i, remove_numbers=remove_numbers) for i in xs]
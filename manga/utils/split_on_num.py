@@ -1,6 +1,40 @@
-import regex
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+from functools import lru_cache, cache
+from array import array
+import math
 
+if TYPE_CHECKING:
+    from collections.abc import Iterable
 
+    import regex
+
+__all__ = ("split_on_num", "Splits", "split_many")
+
+
+@cache
+def _pattern(only_positive: bool) -> regex.Pattern:
+    """
+    The pattern finding the last number in a string, compiled on first use since regex is slow to import
+    """
+    import regex  # pylint: disable=import-outside-toplevel,redefined-outer-name
+
+    return regex.compile(r"(?r)\d*\.?\d+" if only_positive else r"(?r)-?\d*\.?\d+")
+
+
+def _split(x: str, search: regex.Match) -> tuple[str, str, str]:
+    """
+    Split x at the last occurrence of the number search found, as x.split would
+    """
+    num: str = search.group()
+    start, end = search.span()
+    if x.find(num, max(0, start - len(num) + 1), start + len(num) - 1) != -1:  # Overlaps, as in '9.9.9'
+        split: list[str] = x.split(num)
+        return num.join(split[:-1]), num, split[-1]
+    return x[:start], num, x[end:]
+
+
+@lru_cache(maxsize=1 << 16)
 def split_on_num(x: str, only_positive: bool = True) -> tuple[str, float, str]:
     """
     Split x at the number greater than one
@@ -9,10 +43,60 @@ def split_on_num(x: str, only_positive: bool = True) -> tuple[str, float, str]:
     Returns a tuple containing the string before the last number,
     the last number as a float, and the remaining string
     """
-    pattern: str = r"(?r)\d*\.?\d+" if only_positive else r"(?r)-?\d*\.?\d+"
-    search: regex.Match | None = regex.search(pattern, x)
+    search: regex.Match | None = _pattern(only_positive).search(x)
     if search is None:
         raise ValueError(f"There is no number in {x}")
-    num: str = search.group()
-    split = x.split(num)
-    return num.join(split[:-1]), float(num), split[-1]
+    left, num, right = _split(x, search)
+    return left, float(num), right
+
+
+@dataclass(slots=True)
+class Splits:
+    """
+    The split_on_num of many strings, stored compactly
+    Prefixes and suffixes are ids into strings; strings with no number have a NaN number
+    """
+
+    strings: list[str] = field(default_factory=list)
+    prefix: array = field(default_factory=lambda: array("I"))
+    number: array = field(default_factory=lambda: array("d"))
+    suffix: array = field(default_factory=lambda: array("I"))
+
+    def __len__(self) -> int:
+        return len(self.number)
+
+    def __getitem__(self, i: int) -> tuple[str, float, str] | None:
+        """
+        Return the split_on_num of the i'th string, or None if it has no number
+        """
+        if math.isnan(self.number[i]):
+            return None
+        return self.strings[self.prefix[i]], self.number[i], self.strings[self.suffix[i]]
+
+    def differ(self, other: Splits) -> list[int]:
+        """
+        Return the indices at which the numbers of self and other differ; NaN differs from everything
+        """
+        assert len(self) == len(other), "Splits must be of equal length"
+        return [i for i, (a, b) in enumerate(zip(self.number, other.number)) if a != b]
+
+
+def split_many(xs: Iterable[str], only_positive: bool = True) -> Splits:
+    """
+    split_on_num each of xs into a Splits
+    """
+    ret = Splits()
+    ids: dict[str, int] = {}
+    search = _pattern(only_positive).search
+    for x in xs:
+        if (found := search(x)) is None:
+            ret.prefix.append(ids.setdefault("", len(ids)))
+            ret.number.append(math.nan)
+            ret.suffix.append(ids.setdefault("", len(ids)))
+            continue
+        left, num, right = _split(x, found)
+        ret.prefix.append(ids.setdefault(left, len(ids)))
+        ret.number.append(float(num))
+        ret.suffix.append(ids.setdefault(right, len(ids)))
+    ret.strings = list(ids)
+    return ret